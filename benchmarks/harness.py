@@ -0,0 +1,99 @@
+import json
+import platform
+import time
+from typing import List, Dict
+
+REPEAT = 5  # a benchmark is run that many times and the best time is taken
+TOLERANCE = 0.15  # relative change against the baseline which is reported as a regression
+
+OK = "ok"
+REGRESSION = "REGRESSION"
+IMPROVEMENT = "improved"
+NEW = "new"
+
+
+class BenchmarkResult:
+    """
+    Single measurement: benchmark name, parameters it was run with, value and
+    whether higher value is better (throughput) or worse (time per operation)
+    """
+
+    def __init__(self, name: str, params: Dict[str, object], value: float, unit: str,
+                 higher_is_better: bool = False) -> None:
+        self.name = name
+        self.params = params
+        self.value = value
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies the benchmark and its parameters across result files
+        """
+        params = ", ".join("{}={}".format(name, value) for name, value in sorted(self.params.items()))
+        return "{}({})".format(self.name, params)
+
+    def as_dict(self) -> dict:
+        return {"name": self.name, "params": self.params, "value": self.value, "unit": self.unit,
+                "higher_is_better": self.higher_is_better}
+
+    @staticmethod
+    def from_dict(value: dict) -> 'BenchmarkResult':
+        return BenchmarkResult(value["name"], value["params"], value["value"], value["unit"],
+                               value["higher_is_better"])
+
+
+def best_time(func, repeat: int = REPEAT) -> float:
+    """
+    Returns the shortest of 'repeat' wall times of 'func' (seconds): the least disturbed run
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def write_results(path: str, results: List[BenchmarkResult]):
+    document = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": [result.as_dict() for result in results],
+    }
+    with open(path, 'w') as stream:
+        json.dump(document, stream, indent=2)
+
+
+def read_results(path: str) -> List[BenchmarkResult]:
+    with open(path, 'r') as stream:
+        document = json.load(stream)
+    return [BenchmarkResult.from_dict(value) for value in document["results"]]
+
+
+def compare(results: List[BenchmarkResult], baseline: List[BenchmarkResult],
+            tolerance: float = TOLERANCE) -> List[list]:
+    """
+    Returns rows of benchmark key, baseline value, current value, relative
+    change and status; the status is a regression when the value got worse
+    by more than 'tolerance'
+    """
+    baseline_values = {result.key: result.value for result in baseline}
+    rows = []
+    for result in results:
+        base = baseline_values.get(result.key)
+        if base is None or base == 0:
+            rows.append([result.key, base, result.value, None, NEW])
+            continue
+        change = (result.value - base) / base
+        improvement = change if result.higher_is_better else -change
+        if improvement < -tolerance:
+            status = REGRESSION
+        elif improvement > tolerance:
+            status = IMPROVEMENT
+        else:
+            status = OK
+        rows.append([result.key, base, result.value, change * 100, status])
+    return rows
@@ -0,0 +1,54 @@
+import random
+import time
+
+from tabulate import tabulate
+
+from src.job.jobs import Job
+from src.job.queue import PriorityQueue
+
+QUEUE_SIZES = [100, 1000, 10000, 100000]
+OPERATIONS = 50000
+PRIORITIES = 10
+
+
+def _filled_queue(size: int, rnd: random.Random) -> PriorityQueue:
+    queue = PriorityQueue(size)
+    for i in range(size):
+        queue.put(Job(i, rnd.randint(1, PRIORITIES)))
+    return queue
+
+
+def bench_full_queue_put(size: int) -> float:
+    """
+    Arrivals into a full queue: every put either evicts the lowest priority job or is rejected
+    """
+    rnd = random.Random(size)
+    queue = _filled_queue(size, rnd)
+    jobs = [Job(size + i, rnd.randint(1, PRIORITIES)) for i in range(OPERATIONS)]
+    started = time.perf_counter()
+    for job in jobs:
+        queue.put(job)
+    return (time.perf_counter() - started) / OPERATIONS
+
+
+def bench_pop_put(size: int) -> float:
+    """
+    Steady state of a full queue: a job is served and a new one arrives
+    """
+    rnd = random.Random(size)
+    queue = _filled_queue(size, rnd)
+    jobs = [Job(size + i, rnd.randint(1, PRIORITIES)) for i in range(OPERATIONS)]
+    started = time.perf_counter()
+    for job in jobs:
+        queue.pop()
+        queue.put(job)
+    return (time.perf_counter() - started) / OPERATIONS
+
+
+if __name__ == '__main__':
+    rows = []
+    for queue_size in QUEUE_SIZES:
+        put = bench_full_queue_put(queue_size)
+        pop_put = bench_pop_put(queue_size)
+        rows.append([queue_size, put * 1e6, pop_put * 1e6])
+    print(tabulate(rows, headers=["Queue size", "Full queue put (us/op)", "Pop + put (us/op)"], numalign="right"))
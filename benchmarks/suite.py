@@ -0,0 +1,204 @@
+import argparse
+import logging
+import sys
+from typing import List
+
+import numpy
+from tabulate import tabulate
+
+from benchmarks.harness import BenchmarkResult, best_time, write_results, read_results, compare, \
+    REPEAT, TOLERANCE, REGRESSION
+from benchmarks.priority_queue import bench_full_queue_put, bench_pop_put
+from src.configuration import ConfigReader
+from src.distribution import ErlangDistribution, ExponentialDistribution
+from src.engine import SimulationEngine
+from src.job.dispatch import DISPATCH_POLICIES, create_dispatch_policy
+from src.job.jobs import Job
+from src.job.manager import ServerLoadManager
+from src.job.queue import JobStorage
+from src.job.server import SimulatedServer
+from src.runner import run_simulation
+from src.stats.eventbus import EventBus, AsyncEventBus, Listener
+from src.systemtime import VirtualClock, use_clock
+
+SAMPLES = 200000  # values drawn by distribution benchmarks
+OPERATIONS = 20000  # operations of component benchmarks
+JOBS = 20000  # expected arrivals of end-to-end runs
+PROCESS_TIME = 100  # mean processing time of end-to-end runs (ms)
+
+QUEUE_SIZES = [100, 10000]
+SERVERS_NUMBERS = [1, 8, 64]
+MANAGER_QUEUE_SIZES = [10, 1000]
+DISPATCH_SERVERS = [8, 1024]
+END_TO_END_SERVERS = [1, 4, 16]
+END_TO_END_QUEUE_SIZES = [5, 50]
+LOADS = [0.5, 0.9, 1.2]  # arrival rate to total service rate
+
+
+def bench_distributions(samples: int) -> List[BenchmarkResult]:
+    results = []
+    for name, distribution in [("erlang", ErlangDistribution(2, 100)), ("exponential", ExponentialDistribution(100))]:
+        seconds = best_time(lambda: [distribution.next_random() for _ in range(samples)])
+        results.append(BenchmarkResult("distribution.next_random", {"type": name}, seconds / samples * 1e9, "ns/op"))
+    return results
+
+
+def bench_queue() -> List[BenchmarkResult]:
+    results = []
+    for size in QUEUE_SIZES:
+        # every run fills a new queue, so the best of several runs is taken here
+        put = min(bench_full_queue_put(size) for _ in range(REPEAT))
+        pop_put = min(bench_pop_put(size) for _ in range(REPEAT))
+        results.append(BenchmarkResult("queue.put_full", {"queue": size}, put * 1e9, "ns/op"))
+        results.append(BenchmarkResult("queue.pop_put", {"queue": size}, pop_put * 1e9, "ns/op"))
+    return results
+
+
+def bench_manager_schedule(servers_number: int, queue_size: int, operations: int) -> float:
+    """
+    Arrivals into a system with all servers busy: every job preempts a server,
+    is queued, evicts a queued job or is rejected. Returns seconds per job.
+    """
+    best = None
+    for _ in range(REPEAT):
+        clock = VirtualClock()
+        use_clock(clock)
+        engine = SimulationEngine(clock)  # never run, so servers stay busy
+        eventbus = EventBus()
+        servers = [SimulatedServer(ExponentialDistribution(PROCESS_TIME), i + 1, eventbus, engine)
+                   for i in range(servers_number)]
+        manager = ServerLoadManager(servers, JobStorage(queue_size), eventbus)
+        jobs = [Job(i, 1 + i % 3) for i in range(operations)]
+
+        def schedule():
+            for job in jobs:
+                manager.schedule(job)
+
+        seconds = best_time(schedule, 1)
+        best = seconds if best is None else min(best, seconds)
+    return best / operations
+
+
+def bench_manager(operations: int) -> List[BenchmarkResult]:
+    results = []
+    for servers_number in SERVERS_NUMBERS:
+        for queue_size in MANAGER_QUEUE_SIZES:
+            seconds = bench_manager_schedule(servers_number, queue_size, operations)
+            results.append(BenchmarkResult("manager.schedule", {"servers": servers_number, "queue": queue_size},
+                                           seconds * 1e9, "ns/op"))
+    return results
+
+
+def bench_dispatch(operations: int) -> List[BenchmarkResult]:
+    """
+    Server selection followed by the load change it causes, as the manager does on every arrival
+    """
+    results = []
+    job = Job(1, 1)
+    for name in DISPATCH_POLICIES.keys():
+        for servers_number in DISPATCH_SERVERS:
+            def dispatch():
+                policy = create_dispatch_policy(name, {i: 1.0 for i in range(servers_number)},
+                                                numpy.random.default_rng(1))
+                jobs = [0] * servers_number
+                for _ in range(operations):
+                    server_id = policy.select(job)
+                    jobs[server_id] = jobs[server_id] + 1
+                    policy.jobs_changed(server_id, jobs[server_id])
+
+            seconds = best_time(dispatch)
+            results.append(BenchmarkResult("dispatch.select", {"policy": name, "servers": servers_number},
+                                           seconds / operations * 1e9, "ns/op"))
+    return results
+
+
+def bench_eventbus(operations: int) -> List[BenchmarkResult]:
+    """
+    Dispatch of 'job_arrived' event to a listener which does nothing
+    """
+    use_clock(VirtualClock())
+    job = Job(1, 1)
+    results = []
+
+    eventbus = EventBus()
+    eventbus.add(Listener())
+    seconds = best_time(lambda: [eventbus.job_arrived(job) for _ in range(operations)])
+    results.append(BenchmarkResult("eventbus.dispatch", {"mode": "sync"}, seconds / operations * 1e9, "ns/op"))
+
+    def dispatch_async():
+        async_eventbus = AsyncEventBus()
+        async_eventbus.add(Listener())
+        for _ in range(operations):
+            async_eventbus.job_arrived(job)
+        async_eventbus.all_jobs_processed()  # waits for the worker to deliver every event
+
+    seconds = best_time(dispatch_async)
+    results.append(BenchmarkResult("eventbus.dispatch", {"mode": "async"}, seconds / operations * 1e9, "ns/op"))
+    return results
+
+
+def end_to_end_config(servers_number: int, queue_size: int, load: float, jobs: int) -> ConfigReader:
+    interval = PROCESS_TIME / (load * servers_number)
+    return ConfigReader(None, {"QueuingModel": {
+        "InputDistribution": {"shape": 1, "scale": interval},
+        "ProcessTimeDistribution": {"scale": PROCESS_TIME},
+        "serversNumber": servers_number,
+        "queueSize": queue_size,
+        "priorityLevels": 2,
+        "simulationDuration": int(jobs * interval),
+        "seed": 1,
+        "simulationMode": "discrete",
+    }})
+
+
+def bench_end_to_end(jobs: int) -> List[BenchmarkResult]:
+    results = []
+    for servers_number in END_TO_END_SERVERS:
+        for queue_size in END_TO_END_QUEUE_SIZES:
+            for load in LOADS:
+                config = end_to_end_config(servers_number, queue_size, load, jobs)
+                stats = []
+                seconds = best_time(lambda: stats.append(run_simulation(config)), 3)
+                arrived = stats[-1].arrived_jobs
+                results.append(BenchmarkResult("simulation.jobs_per_second",
+                                               {"servers": servers_number, "queue": queue_size, "load": load},
+                                               arrived / seconds, "jobs/s", higher_is_better=True))
+    return results
+
+
+def run_suite(scale: float = 1.0) -> List[BenchmarkResult]:
+    """
+    Runs every benchmark; 'scale' shrinks or grows the number of operations
+    """
+    results = []
+    results.extend(bench_distributions(int(SAMPLES * scale)))
+    results.extend(bench_queue())
+    results.extend(bench_manager(int(OPERATIONS * scale)))
+    results.extend(bench_dispatch(int(OPERATIONS * scale)))
+    results.extend(bench_eventbus(int(OPERATIONS * scale)))
+    results.extend(bench_end_to_end(int(JOBS * scale)))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks of the simulation hot paths")
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON file of earlier results to compare with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="relative slowdown reported as a regression (default: %(default)s)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of the number of operations")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run_suite(args.scale)
+    if args.output:
+        write_results(args.output, results)
+
+    if args.baseline:
+        rows = compare(results, read_results(args.baseline), args.tolerance)
+        print(tabulate(rows, headers=["Benchmark", "Baseline", "Current", "Change (%)", "Status"], numalign="right"))
+        if any(row[4] == REGRESSION for row in rows):
+            sys.exit(1)
+    else:
+        rows = [[result.key, result.value, result.unit] for result in results]
+        print(tabulate(rows, headers=["Benchmark", "Value", "Unit"], numalign="right"))
@@ -0,0 +1,191 @@
+import math
+from collections import OrderedDict
+from typing import List, Dict
+
+from tabulate import tabulate
+
+from src.configuration import ConfigReader
+from src.distribution import Distribution, ErlangDistribution, ExponentialDistribution
+from src.job.dispatch import CENTRAL_DISPATCH
+from src.network import routing_matrix, traffic_equations
+
+
+def erlang_b(servers: int, offered_load: float) -> float:
+    """
+    Blocking probability of M/M/c/c system with 'offered_load' = arrival rate / service rate
+    """
+    blocking = 1.0
+    for k in range(1, servers + 1):
+        blocking = offered_load * blocking / (k + offered_load * blocking)
+    return blocking
+
+
+def erlang_c(servers: int, offered_load: float) -> float:
+    """
+    Probability that an arrival waits in M/M/c system with infinite queue
+    """
+    if offered_load >= servers:
+        return 1.0
+    blocking = erlang_b(servers, offered_load)
+    return blocking / (1 - offered_load / servers * (1 - blocking))
+
+
+def mmc_wait_time(arrival_rate: float, service_rate: float, servers: int) -> float:
+    """
+    Mean time in queue of M/M/c system with infinite queue
+    """
+    if arrival_rate >= servers * service_rate:
+        return math.inf
+    return erlang_c(servers, arrival_rate / service_rate) / (servers * service_rate - arrival_rate)
+
+
+def allen_cunneen_wait_time(arrival_rate: float, service_rate: float, servers: int,
+                            arrival_scv: float, service_scv: float) -> float:
+    """
+    Allen-Cunneen approximation of mean time in queue of G/G/c system with
+    infinite queue (e.g. E_k/M/c with 'arrival_scv' = 1/k and 'service_scv' = 1)
+    """
+    return mmc_wait_time(arrival_rate, service_rate, servers) * (arrival_scv + service_scv) / 2
+
+
+class QueueMetrics:
+    """
+    Steady-state metrics of M/M/c/K system, where K = c + queue size
+    """
+
+    model = "M/M/c/K"
+
+    def __init__(self, arrival_rate: float, service_rate: float, servers: int, queue_size: int) -> None:
+        capacity = servers + queue_size
+        offered_load = arrival_rate / service_rate
+
+        # state probabilities are computed in log space, so large loads don't overflow
+        log_load = math.log(offered_load) if offered_load > 0 else -math.inf
+        log_p = [0.0]
+        for n in range(1, capacity + 1):
+            log_p.append(log_p[-1] + log_load - math.log(min(n, servers)))
+        max_log = max(log_p)
+        weights = [math.exp(x - max_log) for x in log_p]
+        total = sum(weights)
+        p = [w / total for w in weights]
+
+        self.idle_probability = p[0]
+        self.reject_probability = p[capacity]
+        self.queue_length = sum((n - servers) * p[n] for n in range(servers + 1, capacity + 1))
+        self.jobs_in_system = sum(n * p[n] for n in range(capacity + 1))
+        self.utilization = (self.jobs_in_system - self.queue_length) / servers
+        self.process_time = 1 / service_rate
+
+        # rate of jobs entering the queue: arrivals finding all servers busy and free room in the queue
+        queued_rate = arrival_rate * sum(p[n] for n in range(servers, capacity))
+        self.queued_wait_time = self.queue_length / queued_rate if queued_rate > 0 else 0.0
+
+
+class ApproximateQueueMetrics:
+    """
+    Allen-Cunneen approximation of steady-state metrics of G/G/c system from
+    squared coefficients of variation of interval and processing time (e.g.
+    E_k/M/c with 'arrival_scv' = 1/k and 'service_scv' = 1). The queue is taken
+    as infinite, so it is close to the simulated one while the chance of reject
+    is small, and there is no idle or reject probability.
+    """
+
+    model = "G/G/c, Allen-Cunneen approximation"
+
+    def __init__(self, arrival_rate: float, service_rate: float, servers: int,
+                 arrival_scv: float, service_scv: float) -> None:
+        offered_load = arrival_rate / service_rate
+        wait_time = allen_cunneen_wait_time(arrival_rate, service_rate, servers, arrival_scv, service_scv)
+
+        self.idle_probability = None
+        self.reject_probability = None
+        self.queue_length = arrival_rate * wait_time
+        self.jobs_in_system = self.queue_length + offered_load
+        self.utilization = offered_load / servers
+        self.process_time = 1 / service_rate
+        # only jobs finding all servers busy are queued, Erlang C is the chance of that
+        self.queued_wait_time = wait_time / erlang_c(servers, offered_load)
+
+
+def is_poisson(distribution: Distribution) -> bool:
+    if isinstance(distribution, ErlangDistribution):
+        return distribution.shape == 1
+    return isinstance(distribution, ExponentialDistribution)
+
+
+def closed_form(config: ConfigReader):
+    """
+    Returns M/M/c/K metrics of the configured model, approximate G/G/c ones
+    when arrivals aren't Poisson or processing time isn't exponential, or None
+    when the model has neither: jobs are replayed from a trace, there are several priority levels
+    (preemption and eviction lose jobs which M/M/c/K would keep), servers have different speeds
+    or queues of their own, servers can't keep up with arrivals or a distribution has infinite variance.
+    """
+    if config.trace is not None:
+        return None
+    if config.dispatch_policy != CENTRAL_DISPATCH or any(speed != 1 for speed in config.server_speeds):
+        return None
+    if config.priority_levels != 1:
+        return None
+    input_dist = config.input_distribution()
+    time_dist = config.process_time_distribution()
+    arrival_rate, service_rate, servers = 1 / input_dist.mean, 1 / time_dist.mean, config.servers_number
+    if is_poisson(input_dist) and isinstance(time_dist, ExponentialDistribution):
+        return QueueMetrics(arrival_rate, service_rate, servers, config.queue_size)
+    if arrival_rate >= servers * service_rate or math.isinf(input_dist.scv) or math.isinf(time_dist.scv):
+        return None
+    return ApproximateQueueMetrics(arrival_rate, service_rate, servers, input_dist.scv, time_dist.scv)
+
+
+def analytic_model(config: ConfigReader) -> str:
+    """
+    Returns name of the model behind 'analytic_stats', or None when there are no analytic results
+    """
+    metrics = closed_form(config)
+    return metrics.model if metrics is not None else None
+
+
+def analytic_stats(config: ConfigReader) -> List[list]:
+    """
+    Returns closed-form (or approximate, see 'analytic_model') results as
+    general stats rows (metric name, value and unit), or None when the model has neither
+    """
+    metrics = closed_form(config)
+    if metrics is None:
+        return None
+    rows = [
+        ["Average job processing time", metrics.process_time, "ms"],
+        ["Average time in queue", metrics.queued_wait_time, "ms"],
+        ["Average queue size", metrics.queue_length, "jobs in queue"],
+        ["Average jobs number in the system", metrics.jobs_in_system, "jobs"],
+        ["Servers utilization", metrics.utilization * 100, "%"],
+    ]
+    if metrics.reject_probability is not None:
+        rows.append(["Chance of system being idle", round(metrics.idle_probability * 100, 2), "%"])
+        rows.append(["Chance of reject", round(metrics.reject_probability * 100, 2), "%"])
+    return rows
+
+
+def network_offered_loads(config: ConfigReader) -> Dict[str, float]:
+    """
+    Returns offered load of every network station (arrival rate by traffic
+    equations over its total service rate) keyed by station name. Jobs lost at
+    full queues are still counted, so it is the load the station would get with
+    an unbounded queue: a station above 1 can't keep up.
+    """
+    names = config.stations
+    entry = config.network_entry
+    arrival_rate = 1 / config.input_distribution().mean
+    rates = traffic_equations([arrival_rate * entry.get(name, 0.0) for name in names],
+                              routing_matrix(names, config.network_routing))
+    return OrderedDict((name, rate * config.station_process_time_distribution(name).mean /
+                        config.station_servers_number(name)) for name, rate in zip(names, rates))
+
+
+def get_comparison_stats(simulated: List[list], analytic: List[list]) -> str:
+    """
+    Returns table of simulated values next to closed-form ones
+    """
+    analytic_values = {name: value for name, value, _ in analytic}
+    table = [[name, value, analytic_values.get(name), unit] for name, value, unit in simulated]
+    return tabulate(table, headers=["Metric", "Simulated", "Analytic", "Unit"], numalign="right")
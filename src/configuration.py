@@ -1,51 +1,463 @@
+import copy
+import itertools
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, List
+
+import numpy
 import yaml
 
-from src.distribution import Distribution, ErlangDistribution, ExponentialDistribution
+from src.distribution import Distribution, create_distribution, SCALE_KEY, FILE_KEY
+from src.job.dispatch import CENTRAL_DISPATCH, DISPATCH_POLICIES
+from src.log import LOG_BUFFER_SIZE
+from src.stats.eventbus import EVENT_BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
 
 CONFIG_ROOT_KEY = "QueuingModel"
 INPUT_DISTRIBUTION_KEY = "InputDistribution"
 PROCESS_TIME_DISTRIBUTION = "ProcessTimeDistribution"
 
-SHAPE_KEY = "shape"
-SCALE_KEY = "scale"
 RATE_KEY = "rate"
 
+INPUT_DISTRIBUTION_TYPE = "erlang"  # types of distributions with no 'type' key in the config
+PROCESS_TIME_DISTRIBUTION_TYPE = "exponential"
+
 SERVERS_NUMBER_KEY = "serversNumber"
 QUEUE_SIZE_KEY = "queueSize"
+SERVER_SPEEDS_KEY = "serverSpeeds"
+DISPATCH_POLICY_KEY = "dispatchPolicy"
+PRIORITY_LEVELS_KEY = "priorityLevels"
 SIMULATION_DURATION_KEY = "simulationDuration"
+SEED_KEY = "seed"
+TRACE_KEY = "trace"
+WARMUP_KEY = "warmup"
+BATCHES_KEY = "batches"
+
+WARMUP_AUTO = "auto"  # warm-up is detected by MSER-5 rule
+
+NETWORK_KEY = "Network"
+STATIONS_KEY = "stations"
+ENTRY_KEY = "entry"
+ROUTING_KEY = "routing"
+
+PRECISION_KEY = "precision"
+DEFAULT_BATCHES = 20  # batches of sequential stopping when 'batches' is not set
+SIMULATION_MODE_KEY = "simulationMode"
+
+DISCRETE_MODE = "discrete"
+REALTIME_MODE = "realtime"
+ASYNCIO_MODE = "asyncio"
+SIMULATION_MODES = [DISCRETE_MODE, REALTIME_MODE, ASYNCIO_MODE]
+
+LOG_LEVEL_KEY = "logLevel"
+LOG_BUFFER_SIZE_KEY = "logBufferSize"
+
+EVENT_DISPATCH_KEY = "eventDispatch"
+EVENT_BUFFER_SIZE_KEY = "eventBufferSize"
+
+SYNC_DISPATCH = "sync"
+ASYNC_DISPATCH = "async"
+EVENT_DISPATCH_MODES = [SYNC_DISPATCH, ASYNC_DISPATCH]
+
+ANALYTIC_KEY = "analytic"
+
+ANALYTIC_OFF = "off"
+ANALYTIC_COMPARE = "compare"  # closed-form results are printed next to simulated ones
+ANALYTIC_ONLY = "only"  # simulation is skipped where closed-form results exist
+ANALYTIC_MODES = [ANALYTIC_OFF, ANALYTIC_COMPARE, ANALYTIC_ONLY]
+
+PROFILE_KEY = "profile"
+PROFILE_OUTPUT_KEY = "profileOutput"
+
+PROFILE_OFF = "off"
+PROFILE_SUMMARY = "summary"  # calls and time spent per component are logged after the run
+PROFILE_CPROFILE = "cprofile"  # the run is profiled by cProfile as well, stats are written to the output file
+PROFILE_MODES = [PROFILE_OFF, PROFILE_SUMMARY, PROFILE_CPROFILE]
+PROFILE_OUTPUT = "profile.pstats"
+
+REPLICATIONS_KEY = "replications"
+CONFIDENCE_LEVEL_KEY = "confidenceLevel"
+ANTITHETIC_KEY = "antithetic"
+COMPARE_WITH_KEY = "compareWith"
+
+SWEEP_OUTPUT_KEY = "sweepOutput"
+SWEEP_CACHE_KEY = "sweepCache"
+
+# range of values for a swept parameter: {from: 1, to: 8, step: 1}, bounds are inclusive
+RANGE_FROM_KEY = "from"
+RANGE_TO_KEY = "to"
+RANGE_STEP_KEY = "step"
+
+# parameters which accept a list or a range of values to run a sweep over
+SWEEP_PARAMETERS = [
+    (SERVERS_NUMBER_KEY,),
+    (QUEUE_SIZE_KEY,),
+    (INPUT_DISTRIBUTION_KEY, SCALE_KEY),
+    (PROCESS_TIME_DISTRIBUTION, SCALE_KEY),
+]
+
+
+def expand_values(value) -> list:
+    """
+    Expands a swept parameter value (list or range) into the list of values
+    """
+    if isinstance(value, list):
+        return value
+    start = value[RANGE_FROM_KEY]
+    stop = value[RANGE_TO_KEY]
+    step = value.get(RANGE_STEP_KEY, 1)
+    if step <= 0:
+        raise Exception("Range step should be positive. Actual: {}".format(step))
+    values = []
+    i = 0
+    current = start
+    while current <= stop:
+        values.append(current)
+        i = i + 1
+        current = start + i * step
+    return values
 
 
 class ConfigReader:
 
-    def __init__(self, config_file_path) -> None:
+    def __init__(self, config_file_path, config: dict = None) -> None:
         self.config_path = config_file_path
-        self._config = None
+        self._config = config
 
-    @property
-    def input_distribution(self) -> Distribution:
-        dist_config = self._get_config()[INPUT_DISTRIBUTION_KEY]
-        shape = int(dist_config[SHAPE_KEY])
-        scale = float(dist_config[SCALE_KEY])
-        return ErlangDistribution(shape, scale)
+    def input_distribution(self, rng: numpy.random.Generator = None) -> Distribution:
+        return self._distribution((INPUT_DISTRIBUTION_KEY,), INPUT_DISTRIBUTION_TYPE, rng)
 
-    @property
-    def process_time_distribution(self) -> Distribution:
-        dist_config = self._get_config()[PROCESS_TIME_DISTRIBUTION]
-        scale = float(dist_config[SCALE_KEY])
-        return ExponentialDistribution(scale)
+    def process_time_distribution(self, rng: numpy.random.Generator = None) -> Distribution:
+        return self._distribution((PROCESS_TIME_DISTRIBUTION,), PROCESS_TIME_DISTRIBUTION_TYPE, rng)
 
     @property
     def servers_number(self) -> int:
-        return self._get_config()[SERVERS_NUMBER_KEY]
+        return int(self._get_scalar(SERVERS_NUMBER_KEY))
 
     @property
     def queue_size(self) -> int:
-        return self._get_config()[QUEUE_SIZE_KEY]
+        return int(self._get_scalar(QUEUE_SIZE_KEY))
+
+    @property
+    def server_speeds(self) -> List[float]:
+        """
+        Relative speed of every server (processing time is divided by it), 1 for all when not set
+        """
+        speeds = self._get_config().get(SERVER_SPEEDS_KEY)
+        if speeds is None:
+            return [1.0] * self.servers_number
+        speeds = [float(speed) for speed in speeds]
+        if len(speeds) != self.servers_number or any(speed <= 0 for speed in speeds):
+            raise Exception("Server speeds should be {} positive values. Actual: {}".format(self.servers_number,
+                                                                                         speeds))
+        return speeds
+
+    @property
+    def dispatch_policy(self) -> str:
+        """
+        Name of the policy jobs are dispatched to per-server queues by, 'central' for a single shared queue
+        """
+        policy = self._get_config().get(DISPATCH_POLICY_KEY, CENTRAL_DISPATCH)
+        if policy != CENTRAL_DISPATCH and policy not in DISPATCH_POLICIES:
+            raise Exception("Unknown dispatch policy '{}'. Expected one of: {}".format(
+                policy, [CENTRAL_DISPATCH] + list(DISPATCH_POLICIES.keys())))
+        return policy
+
+    @property
+    def priority_levels(self) -> int:
+        return int(self._get_config().get(PRIORITY_LEVELS_KEY, 2))
 
     @property
     def simulation_duration(self) -> int:
         return int(self._get_config()[SIMULATION_DURATION_KEY])
 
+    @property
+    def warmup(self) -> float:
+        """
+        Duration of the warm-up excluded from the stats (ms), 0 when it is detected automatically
+        """
+        warmup = self._get_config().get(WARMUP_KEY, 0)
+        if warmup == WARMUP_AUTO:
+            return 0
+        warmup = float(warmup)
+        if warmup < 0 or warmup >= self.simulation_duration:
+            raise Exception("Warm-up should be from 0 to the simulation duration. Actual: {}".format(warmup))
+        return warmup
+
+    @property
+    def auto_warmup(self) -> bool:
+        return self._get_config().get(WARMUP_KEY, 0) == WARMUP_AUTO
+
+    @property
+    def batches(self) -> int:
+        """
+        Number of batches a single run is split into for batch means estimation, 0 to disable
+        """
+        batches = int(self._get_config().get(BATCHES_KEY, 0))
+        if batches == 0 and self.precision:
+            return DEFAULT_BATCHES
+        return batches
+
+    @property
+    def precision(self) -> Dict[str, float]:
+        """
+        Required confidence interval half-width of batch means keyed by metric name
+        (e.g. {'Chance of reject': 0.5}). When set, arrivals stop once every target
+        is reached, and simulation duration is the upper limit of the run.
+        """
+        return self._get_config().get(PRECISION_KEY)
+
+    @property
+    def trace(self) -> str:
+        """
+        Path of the recorded jobs file replayed instead of the distributions (relative
+        to the config file), None when jobs are generated
+        """
+        trace = self._get_config().get(TRACE_KEY)
+        return self._resolve_path(trace) if trace is not None else None
+
+    @property
+    def seed(self) -> int:
+        """
+        Seed all random streams are derived from, None for a random one
+        """
+        return self._get_config().get(SEED_KEY)
+
+    def is_network(self) -> bool:
+        return self._get_config().get(NETWORK_KEY) is not None
+
+    @property
+    def stations(self) -> List[str]:
+        """
+        Names of the network stations in the config order
+        """
+        stations = self._get_config()[NETWORK_KEY].get(STATIONS_KEY)
+        if not stations:
+            raise Exception("Network should have at least one station")
+        return list(stations.keys())
+
+    def station_servers_number(self, station: str) -> int:
+        return int(self._station_value(station, SERVERS_NUMBER_KEY))
+
+    def station_queue_size(self, station: str) -> int:
+        return int(self._station_value(station, QUEUE_SIZE_KEY))
+
+    def station_process_time_distribution(self, station: str, rng: numpy.random.Generator = None) -> Distribution:
+        path = (NETWORK_KEY, STATIONS_KEY, station)
+        if self._get_value(path).get(PROCESS_TIME_DISTRIBUTION) is None:
+            return self.process_time_distribution(rng)
+        return self._distribution(path + (PROCESS_TIME_DISTRIBUTION,), PROCESS_TIME_DISTRIBUTION_TYPE, rng)
+
+    @property
+    def network_entry(self) -> Dict[str, float]:
+        """
+        Share of external arrivals entering each station keyed by station name,
+        all of them enter the first station when not set
+        """
+        entry = self._get_config()[NETWORK_KEY].get(ENTRY_KEY)
+        if entry is None:
+            return OrderedDict([(self.stations[0], 1.0)])
+        entry = self._probabilities(entry, ENTRY_KEY)
+        total = sum(entry.values())
+        if total <= 0:
+            raise Exception("Network entry should have a positive share. Actual: {}".format(entry))
+        return OrderedDict((station, share / total) for station, share in entry.items())
+
+    @property
+    def network_routing(self) -> Dict[str, Dict[str, float]]:
+        """
+        Probabilities to move from a station to the next one keyed by both
+        station names; the rest of the probability is leaving the network
+        """
+        routing = self._get_config()[NETWORK_KEY].get(ROUTING_KEY) or {}
+        stations = self.stations
+        result = OrderedDict()
+        for station, probabilities in routing.items():
+            if station not in stations:
+                raise Exception("Unknown station '{}'. Expected one of: {}".format(station, stations))
+            probabilities = self._probabilities(probabilities or {}, "{}.{}".format(ROUTING_KEY, station))
+            if sum(probabilities.values()) > 1 + 1e-9:
+                raise Exception("Routing probabilities of '{}' should not exceed 1. Actual: {}".format(
+                    station, dict(probabilities)))
+            result[station] = probabilities
+        return result
+
+    @property
+    def simulation_mode(self) -> str:
+        mode = self._get_config().get(SIMULATION_MODE_KEY, DISCRETE_MODE)
+        if mode not in SIMULATION_MODES:
+            raise Exception("Unknown simulation mode '{}'. Expected one of: {}".format(mode, SIMULATION_MODES))
+        return mode
+
+    @property
+    def log_level(self) -> str:
+        return str(self._get_config().get(LOG_LEVEL_KEY, "INFO"))
+
+    @property
+    def log_buffer_size(self) -> int:
+        return int(self._get_config().get(LOG_BUFFER_SIZE_KEY, LOG_BUFFER_SIZE))
+
+    @property
+    def event_dispatch(self) -> str:
+        dispatch = self._get_config().get(EVENT_DISPATCH_KEY, SYNC_DISPATCH)
+        if dispatch not in EVENT_DISPATCH_MODES:
+            raise Exception("Unknown event dispatch '{}'. Expected one of: {}".format(dispatch, EVENT_DISPATCH_MODES))
+        return dispatch
+
+    @property
+    def event_buffer_size(self) -> int:
+        return int(self._get_config().get(EVENT_BUFFER_SIZE_KEY, EVENT_BUFFER_SIZE))
+
+    @property
+    def analytic(self) -> str:
+        mode = self._get_config().get(ANALYTIC_KEY, ANALYTIC_COMPARE)
+        if mode not in ANALYTIC_MODES:
+            raise Exception("Unknown analytic mode '{}'. Expected one of: {}".format(mode, ANALYTIC_MODES))
+        return mode
+
+    @property
+    def profile(self) -> str:
+        mode = self._get_config().get(PROFILE_KEY, PROFILE_OFF)
+        if mode is False:  # YAML reads unquoted 'off' as False
+            mode = PROFILE_OFF
+        if mode not in PROFILE_MODES:
+            raise Exception("Unknown profile mode '{}'. Expected one of: {}".format(mode, PROFILE_MODES))
+        return mode
+
+    @property
+    def profile_output(self) -> str:
+        return self._resolve_path(self._get_config().get(PROFILE_OUTPUT_KEY) or PROFILE_OUTPUT)
+
+    @property
+    def replications(self) -> int:
+        return int(self._get_config().get(REPLICATIONS_KEY, 1))
+
+    @property
+    def confidence_level(self) -> float:
+        return float(self._get_config().get(CONFIDENCE_LEVEL_KEY, 0.95))
+
+    @property
+    def antithetic(self) -> bool:
+        """
+        Whether replications are run in pairs on plain and antithetic random streams
+        """
+        return bool(self._get_config().get(ANTITHETIC_KEY, False))
+
+    @property
+    def compare_with(self) -> Dict[str, object]:
+        """
+        Parameters of the alternative model keyed by dotted parameter name
+        (e.g. {'serversNumber': 3}), None when there is nothing to compare with
+        """
+        return self._get_config().get(COMPARE_WITH_KEY)
+
+    @property
+    def sweep_output(self) -> str:
+        return self._get_config().get(SWEEP_OUTPUT_KEY)
+
+    @property
+    def sweep_cache(self) -> str:
+        return self._get_config().get(SWEEP_CACHE_KEY)
+
+    def sweep_parameters(self) -> Dict[str, list]:
+        """
+        Returns values of every parameter given as a list or a range, keyed by
+        dotted parameter name (e.g. 'ProcessTimeDistribution.scale')
+        """
+        parameters = OrderedDict()
+        for path in SWEEP_PARAMETERS:
+            value = self._find_value(path)  # e.g. uniform distribution has no scale
+            if isinstance(value, (list, dict)):
+                parameters[".".join(path)] = expand_values(value)
+        return parameters
+
+    def is_sweep(self) -> bool:
+        return len(self.sweep_parameters()) != 0
+
+    def sweep_points(self) -> List[Dict[str, object]]:
+        """
+        Returns every combination of swept parameter values
+        """
+        parameters = self.sweep_parameters()
+        names = list(parameters.keys())
+        return [OrderedDict(zip(names, values)) for values in itertools.product(*parameters.values())]
+
+    def with_parameters(self, point: Dict[str, object]) -> 'ConfigReader':
+        """
+        Returns config of a single sweep point, where swept parameters are
+        replaced with the values of 'point'
+        """
+        self._get_config()
+        config = copy.deepcopy(self._config)
+        for name, value in point.items():
+            *parents, key = name.split(".")
+            node = config[CONFIG_ROOT_KEY]
+            for parent in parents:
+                node = node[parent]
+            node[key] = value
+        return ConfigReader(self.config_path, config)
+
+    def as_dict(self) -> dict:
+        return self._get_config()
+
+    def _distribution(self, path: tuple, default_type: str, rng: numpy.random.Generator) -> Distribution:
+        params = dict(self._get_value(path))
+        if SCALE_KEY in params:
+            params[SCALE_KEY] = self._get_scalar(*(path + (SCALE_KEY,)))
+        if params.get(FILE_KEY) is not None:
+            params[FILE_KEY] = self._resolve_path(params[FILE_KEY])
+        return create_distribution(params, default_type, rng)
+
+    def _station_value(self, station: str, key: str):
+        """
+        Returns the value of the station, or the value of the single-queue model when the station doesn't set it
+        """
+        if self._get_value((NETWORK_KEY, STATIONS_KEY, station)).get(key) is None:
+            return self._get_scalar(key)
+        return self._get_scalar(NETWORK_KEY, STATIONS_KEY, station, key)
+
+    def _probabilities(self, probabilities: Dict[str, float], name: str) -> Dict[str, float]:
+        stations = self.stations
+        result = OrderedDict()
+        for station, probability in probabilities.items():
+            if station not in stations:
+                raise Exception("Unknown station '{}' in {}. Expected one of: {}".format(station, name, stations))
+            if probability < 0:
+                raise Exception("Probability should not be negative. Actual: {} in {}".format(probability, name))
+            result[station] = float(probability)
+        return result
+
+    def _resolve_path(self, path: str) -> str:
+        """
+        Returns path relative to the directory of the config file
+        """
+        return os.path.join(os.path.dirname(os.path.abspath(self.config_path)), path)
+
+    def _get_value(self, path):
+        node = self._get_config()
+        for key in path:
+            node = node[key]
+        return node
+
+    def _find_value(self, path):
+        """
+        Returns the value at 'path', or None when any key of it is missing
+        """
+        node = self._get_config()
+        for key in path:
+            if not isinstance(node, dict):
+                return None
+            node = node.get(key)
+        return node
+
+    def _get_scalar(self, *path):
+        value = self._get_value(path)
+        if isinstance(value, (list, dict)):
+            raise Exception("'{}' holds several values, pick a sweep point first".format(".".join(path)))
+        return value
+
     def _get_config(self) -> dict:
         if self._config is None:
             self._config = self._load_config()
@@ -54,6 +466,5 @@ class ConfigReader:
     def _load_config(self):
         with open(self.config_path, 'r') as stream:
             config = yaml.safe_load(stream)
-            print("Loaded config:\n--------\n{}".format(yaml.dump(config)))
-            print("--------")
+            logger.info("Loaded config:\n--------\n%s--------", yaml.dump(config))
             return config
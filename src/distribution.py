@@ -1,53 +1,565 @@
 import functools
 import math
-import random
+import threading
+from collections import OrderedDict
 
+import numpy
 
-def production(function, stop: int, start: int = 1) -> float:
+BLOCK_SIZE = 4096  # number of variates drawn at once to serve 'next_random' calls
+
+TYPE_KEY = "type"
+SCALE_KEY = "scale"
+SHAPE_KEY = "shape"
+SCV_KEY = "scv"
+SIGMA_KEY = "sigma"
+LOW_KEY = "low"
+HIGH_KEY = "high"
+PROBABILITIES_KEY = "probabilities"
+SCALES_KEY = "scales"
+VALUES_KEY = "values"
+FILE_KEY = "file"
+COLUMN_KEY = "column"
+INTERPOLATE_KEY = "interpolate"
+
+
+def normal_quantile(p: numpy.ndarray) -> numpy.ndarray:
     """
-    Calculates product of sequence build using given 'function' from 'start'
-    to 'stop' inclusively.
+    Vectorized quantile function of the standard normal distribution for
+    'p' from (0, 1): rational approximation by P. J. Acklam, relative error
+    below 1.2e-9
     """
-    values = [function(x) for x in range(start, stop + 1)]
-    result = functools.reduce(lambda a, b: a * b, values)
+    a = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+    b = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01]
+    c = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+    d = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00]
+    p_low = 0.02425
+
+    p = numpy.asarray(p, dtype=float)
+    result = numpy.empty_like(p)
+    tail = numpy.minimum(p, 1 - p)
+    central = tail >= p_low
+
+    q = p[central] - 0.5
+    r = q * q
+    result[central] = ((((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q /
+                       (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1))
+
+    q = numpy.sqrt(-2 * numpy.log(tail[~central]))
+    value = ((((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) /
+             ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1))
+    result[~central] = numpy.where(p[~central] < 0.5, value, -value)
     return result
 
 
 class Distribution:
+    """
+    Base class for random value generators. Subclasses implement vectorized
+    'sample', while single values are served from a pre-filled block which is
+    refilled on demand.
+
+    Samples are computed from 'uniforms' by inverse transform, so every value
+    consumes a fixed amount of the random stream: runs of compared models stay
+    in sync (common random numbers) and an antithetic stream yields negatively
+    correlated values.
+    """
+
+    def __init__(self, rng: numpy.random.Generator = None, block_size: int = BLOCK_SIZE) -> None:
+        self._rng = rng if rng is not None else numpy.random.default_rng()
+        self._block_size = block_size
+        self._block = []
+        self._position = 0
+        self._lock = threading.Lock()  # servers of realtime mode share the distribution
 
     def next_random(self) -> float:
-        raise Exception("Method calc is not implemented for {} distribution".format(self.__class__.__name__))
+        with self._lock:
+            if self._position >= len(self._block):
+                self._block = self.sample(self._block_size).tolist()
+                self._position = 0
+            value = self._block[self._position]
+            self._position = self._position + 1
+            return value
+
+    def uniforms(self, *size) -> numpy.ndarray:
+        """
+        Returns array of uniform random values from (0, 1]
+        """
+        return 1.0 - self._rng.random(size)
+
+    def sample(self, n: int) -> numpy.ndarray:
+        """
+        Returns array of 'n' random values
+        """
+        raise Exception("Method sample is not implemented for {} distribution".format(self.__class__.__name__))
+
+    @property
+    def mean(self) -> float:
+        raise Exception("Property mean is not implemented for {} distribution".format(self.__class__.__name__))
+
+    @property
+    def scv(self) -> float:
+        """
+        Squared coefficient of variation: variance divided by squared mean
+        """
+        raise Exception("Property scv is not implemented for {} distribution".format(self.__class__.__name__))
+
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        """
+        Creates the distribution from its parameters in the config
+        """
+        raise Exception("Distribution {} can't be created from config".format(cls.__name__))
+
+
+def required(params: dict, key: str):
+    if params.get(key) is None:
+        raise Exception("Parameter '{}' is required. Actual parameters: {}".format(key, params))
+    return params[key]
 
 
 class ErlangDistribution(Distribution):
 
-    def __init__(self, shape, scale) -> None:
-        super().__init__()
+    def __init__(self, shape, scale, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
         if not isinstance(shape, int):
             raise Exception("Shape should be an integer for the Erlang Distribution")
         self._shape = shape  # alpha/m order of Distribution
-        self._scale = float(scale)  # beta
+        self._scale = float(scale)  # beta - mean of the distribution
 
-        m = self._shape
-        b = self._scale
+        self._phase_scale = self._scale / self._shape  # mean of each of 'shape' exponential phases
 
-        self._coefficient = (-b / m)  # is used each time to generate random number
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        return cls(int(required(params, SHAPE_KEY)), float(required(params, SCALE_KEY)), rng)
 
-    def next_random(self) -> float:
-        prod = self._production()
-        return self._coefficient * math.log(prod)
+    def sample(self, n: int) -> numpy.ndarray:
+        # sum of 'shape' exponential phases
+        return -self._phase_scale * numpy.log(self.uniforms(n, self._shape)).sum(axis=1)
+
+    @property
+    def shape(self) -> int:
+        return self._shape
+
+    @property
+    def mean(self) -> float:
+        return self._scale
 
-    def _production(self):
-        m = self._shape
-        return production(lambda x: random.random(), m)
+    @property
+    def scv(self) -> float:
+        return 1 / self._shape
 
 
 class ExponentialDistribution(Distribution):
 
-    def __init__(self, scale) -> None:
-        super().__init__()
-        self._scale = scale
+    def __init__(self, scale, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
+        self._scale = float(scale)
 
-    def next_random(self) -> float:
-        r = random.random()
-        return - self._scale * math.log(r)
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        return cls(float(required(params, SCALE_KEY)), rng)
+
+    def sample(self, n: int) -> numpy.ndarray:
+        return -self._scale * numpy.log(self.uniforms(n))
+
+    @property
+    def mean(self) -> float:
+        return self._scale
+
+    @property
+    def scv(self) -> float:
+        return 1.0
+
+
+class UniformIntegerDistribution(Distribution):
+    """
+    Integers from 'low' to 'high' inclusively with equal probabilities
+    """
+
+    def __init__(self, low: int, high: int, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
+        self._low = low
+        self._high = high
+
+    def sample(self, n: int) -> numpy.ndarray:
+        values = self._high - self._low + 1
+        return numpy.minimum(self._low + numpy.floor((1.0 - self.uniforms(n)) * values), self._high).astype(int)
+
+    @property
+    def mean(self) -> float:
+        return (self._low + self._high) / 2
+
+    @property
+    def scv(self) -> float:
+        values = self._high - self._low + 1
+        return (values ** 2 - 1) / 12 / self.mean ** 2
+
+
+class DeterministicDistribution(Distribution):
+    """
+    Every value equals 'scale'
+    """
+
+    def __init__(self, scale, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
+        self._scale = float(scale)
+
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        return cls(float(required(params, SCALE_KEY)), rng)
+
+    def sample(self, n: int) -> numpy.ndarray:
+        return numpy.full(n, self._scale)
+
+    @property
+    def mean(self) -> float:
+        return self._scale
+
+    @property
+    def scv(self) -> float:
+        return 0.0
+
+
+class UniformDistribution(Distribution):
+
+    def __init__(self, low, high, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
+        if low > high:
+            raise Exception("Low bound of the Uniform Distribution is greater than high one: {} > {}".format(low, high))
+        self._low = float(low)
+        self._high = float(high)
+
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        return cls(float(required(params, LOW_KEY)), float(required(params, HIGH_KEY)), rng)
+
+    def sample(self, n: int) -> numpy.ndarray:
+        return self._high - (self._high - self._low) * self.uniforms(n)
+
+    @property
+    def mean(self) -> float:
+        return (self._low + self._high) / 2
+
+    @property
+    def scv(self) -> float:
+        return (self._high - self._low) ** 2 / 12 / self.mean ** 2
+
+
+class HyperexponentialDistribution(Distribution):
+    """
+    Mixture of exponential phases: a value is drawn from the phase of mean
+    'scales[i]' with probability 'probabilities[i]'. Models service times
+    with squared coefficient of variation above 1.
+    """
+
+    def __init__(self, probabilities, scales, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
+        if len(probabilities) != len(scales) or len(scales) == 0:
+            raise Exception("Hyperexponential Distribution needs a probability for every phase. "
+                            "Actual: {} and {}".format(probabilities, scales))
+        probabilities = numpy.asarray(probabilities, dtype=float)
+        if abs(probabilities.sum() - 1) > 1e-9:
+            raise Exception("Phase probabilities should sum up to 1. Actual: {}".format(probabilities.tolist()))
+        self._probabilities = probabilities
+        self._scales = numpy.asarray(scales, dtype=float)
+        self._cumulative = numpy.cumsum(probabilities)
+
+    @classmethod
+    def balanced_means(cls, scale, scv, rng: numpy.random.Generator = None) -> 'HyperexponentialDistribution':
+        """
+        Two-phase distribution with the given mean and squared coefficient of
+        variation (at least 1), where both phases contribute equally to the mean
+        """
+        if scv < 1:
+            raise Exception("Hyperexponential Distribution has scv of at least 1. Actual: {}".format(scv))
+        p = (1 + math.sqrt((scv - 1) / (scv + 1))) / 2
+        return cls([p, 1 - p], [scale / (2 * p), scale / (2 * (1 - p))], rng)
+
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        if params.get(PROBABILITIES_KEY) is not None:
+            return cls(params[PROBABILITIES_KEY], required(params, SCALES_KEY), rng)
+        return cls.balanced_means(float(required(params, SCALE_KEY)), float(required(params, SCV_KEY)), rng)
+
+    def sample(self, n: int) -> numpy.ndarray:
+        uniforms = self.uniforms(n, 2)
+        phases = numpy.searchsorted(self._cumulative, 1.0 - uniforms[:, 0], side='right')
+        phases = numpy.minimum(phases, len(self._scales) - 1)
+        return -self._scales[phases] * numpy.log(uniforms[:, 1])
+
+    @property
+    def mean(self) -> float:
+        return float((self._probabilities * self._scales).sum())
+
+    @property
+    def scv(self) -> float:
+        second_moment = float((2 * self._probabilities * self._scales ** 2).sum())
+        return second_moment / self.mean ** 2 - 1
+
+
+class LognormalDistribution(Distribution):
+    """
+    Values whose logarithm is normal with standard deviation 'sigma', scaled
+    so the mean is 'scale'
+    """
+
+    def __init__(self, scale, sigma, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
+        self._scale = float(scale)
+        self._sigma = float(sigma)
+        self._mu = math.log(self._scale) - self._sigma ** 2 / 2  # mean of the logarithm
+
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        return cls(float(required(params, SCALE_KEY)), float(required(params, SIGMA_KEY)), rng)
+
+    def sample(self, n: int) -> numpy.ndarray:
+        uniforms = numpy.nextafter(self.uniforms(n), 0.0)  # quantile of 1 is infinite
+        return numpy.exp(self._mu - self._sigma * normal_quantile(uniforms))
+
+    @property
+    def mean(self) -> float:
+        return self._scale
+
+    @property
+    def scv(self) -> float:
+        return math.expm1(self._sigma ** 2)
+
+
+class WeibullDistribution(Distribution):
+    """
+    Weibull distribution of the given 'shape' scaled so the mean is 'scale':
+    heavier tail than exponential for shape below 1, lighter above it
+    """
+
+    def __init__(self, shape, scale, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
+        if shape <= 0:
+            raise Exception("Shape of the Weibull Distribution should be positive. Actual: {}".format(shape))
+        self._shape = float(shape)
+        self._scale = float(scale)
+        self._lambda = self._scale / math.gamma(1 + 1 / self._shape)
+
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        return cls(float(required(params, SHAPE_KEY)), float(required(params, SCALE_KEY)), rng)
+
+    def sample(self, n: int) -> numpy.ndarray:
+        return self._lambda * (-numpy.log(self.uniforms(n))) ** (1 / self._shape)
+
+    @property
+    def mean(self) -> float:
+        return self._scale
+
+    @property
+    def scv(self) -> float:
+        return math.gamma(1 + 2 / self._shape) / math.gamma(1 + 1 / self._shape) ** 2 - 1
+
+
+class ParetoDistribution(Distribution):
+    """
+    Pareto distribution of tail index 'shape' (above 1) scaled so the mean is
+    'scale'. Variance is infinite for shape up to 2.
+    """
+
+    def __init__(self, shape, scale, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
+        if shape <= 1:
+            raise Exception("Shape of the Pareto Distribution should be above 1 to have a mean. Actual: {}"
+                            .format(shape))
+        self._shape = float(shape)
+        self._scale = float(scale)
+        self._minimum = self._scale * (self._shape - 1) / self._shape
+
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        return cls(float(required(params, SHAPE_KEY)), float(required(params, SCALE_KEY)), rng)
+
+    def sample(self, n: int) -> numpy.ndarray:
+        return self._minimum * self.uniforms(n) ** (-1 / self._shape)
+
+    @property
+    def mean(self) -> float:
+        return self._scale
+
+    @property
+    def scv(self) -> float:
+        if self._shape <= 2:
+            return math.inf
+        return 1 / (self._shape * (self._shape - 2))
+
+
+@functools.lru_cache(maxsize=16)
+def load_sample(path: str, column: int = 0) -> numpy.ndarray:
+    """
+    Loads sample values from a '.npy' array or a text file with a value per
+    line (or CSV with values in 'column', header line is skipped). Files are
+    loaded once per process, every distribution of the run shares the values.
+    """
+    if path.endswith(".npy"):
+        values = numpy.load(path)
+        values = values[:, column] if values.ndim == 2 else values
+    else:
+        try:
+            values = numpy.loadtxt(path, delimiter=",", usecols=column, ndmin=1)
+        except ValueError:
+            values = numpy.loadtxt(path, delimiter=",", usecols=column, ndmin=1, skiprows=1)
+    values = numpy.asarray(values, dtype=float)
+    values.setflags(write=False)
+    return values
+
+
+def sample_values(params: dict) -> numpy.ndarray:
+    """
+    Returns sample values given inline by 'values' or in the 'file' of the distribution config
+    """
+    if params.get(FILE_KEY) is not None:
+        return load_sample(params[FILE_KEY], int(params.get(COLUMN_KEY, 0)))
+    return numpy.asarray(required(params, VALUES_KEY), dtype=float)
+
+
+class EmpiricalDistribution(Distribution):
+    """
+    Distribution of a measured sample. Values are sorted once into the inverse
+    CDF table, so a draw is an O(1) lookup of a uniform's position in the
+    table: the sample value itself, or with 'interpolate' a value on the line
+    between neighbouring ones (continuous distribution over the sample range).
+    """
+
+    def __init__(self, values, rng: numpy.random.Generator = None, interpolate: bool = False) -> None:
+        super().__init__(rng)
+        if len(values) == 0:
+            raise Exception("Empirical Distribution needs at least one value")
+        self._values = numpy.sort(numpy.asarray(values, dtype=float))
+        self._interpolate = interpolate and len(self._values) > 1
+        if self._interpolate:
+            # every segment between neighbouring values has equal probability
+            lows = self._values[:-1]
+            highs = self._values[1:]
+            self._mean = float(((lows + highs) / 2).mean())
+            self._second_moment = float(((lows ** 2 + lows * highs + highs ** 2) / 3).mean())
+        else:
+            self._mean = float(self._values.mean())
+            self._second_moment = float((self._values ** 2).mean())
+
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        return cls(sample_values(params), rng, bool(params.get(INTERPOLATE_KEY, False)))
+
+    def sample(self, n: int) -> numpy.ndarray:
+        uniforms = self.uniforms(n)
+        size = len(self._values)
+        if self._interpolate:
+            positions = (1.0 - uniforms) * (size - 1)  # from [0, size - 1)
+            indexes = positions.astype(int)
+            lows = self._values[indexes]
+            return lows + (positions - indexes) * (self._values[indexes + 1] - lows)
+        # inverse of the step CDF: uniforms from (0, 1] map to indexes 0..size-1
+        indexes = numpy.ceil(uniforms * size).astype(int) - 1
+        return self._values[numpy.maximum(indexes, 0)]
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    @property
+    def scv(self) -> float:
+        return (self._second_moment - self._mean ** 2) / self._mean ** 2
+
+
+class DiscreteDistribution(Distribution):
+    """
+    Distribution over a finite set of values with the given probabilities
+    (or frequencies of values in a sample). Draws take O(1) time regardless of
+    the number of values, using alias table built by Vose's method: a column
+    is picked uniformly, then either its own value or its alias.
+    """
+
+    def __init__(self, values, probabilities, rng: numpy.random.Generator = None) -> None:
+        super().__init__(rng)
+        if len(values) != len(probabilities) or len(values) == 0:
+            raise Exception("Discrete Distribution needs a probability for every value. "
+                            "Actual: {} and {}".format(values, probabilities))
+        self._values = numpy.asarray(values, dtype=float)
+        self._probabilities = numpy.asarray(probabilities, dtype=float) / float(numpy.sum(probabilities))
+        self._thresholds, self._aliases = DiscreteDistribution._alias_table(self._probabilities)
+
+    @classmethod
+    def from_sample(cls, sample, rng: numpy.random.Generator = None) -> 'DiscreteDistribution':
+        values, counts = numpy.unique(sample, return_counts=True)
+        return cls(values, counts, rng)
+
+    @classmethod
+    def from_config(cls, params: dict, rng: numpy.random.Generator = None) -> 'Distribution':
+        if params.get(PROBABILITIES_KEY) is not None:
+            return cls(required(params, VALUES_KEY), params[PROBABILITIES_KEY], rng)
+        return cls.from_sample(sample_values(params), rng)
+
+    @staticmethod
+    def _alias_table(probabilities: numpy.ndarray):
+        size = len(probabilities)
+        thresholds = probabilities * size  # chance to keep the column's own value
+        aliases = numpy.arange(size)
+        small = [i for i in range(size) if thresholds[i] < 1]
+        large = [i for i in range(size) if thresholds[i] >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            aliases[less] = more
+            thresholds[more] = thresholds[more] + thresholds[less] - 1
+            if thresholds[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        for i in small + large:  # leftovers differ from 1 by rounding errors only
+            thresholds[i] = 1.0
+        return thresholds, aliases
+
+    def sample(self, n: int) -> numpy.ndarray:
+        uniforms = 1.0 - self.uniforms(n, 2)  # from [0, 1)
+        columns = (uniforms[:, 0] * len(self._values)).astype(int)
+        keep = uniforms[:, 1] < self._thresholds[columns]
+        return self._values[numpy.where(keep, columns, self._aliases[columns])]
+
+    @property
+    def mean(self) -> float:
+        return float((self._values * self._probabilities).sum())
+
+    @property
+    def scv(self) -> float:
+        second_moment = float((self._values ** 2 * self._probabilities).sum())
+        return second_moment / self.mean ** 2 - 1
+
+
+# distribution classes selected by 'type' key of the config
+DISTRIBUTIONS = OrderedDict([
+    ("erlang", ErlangDistribution),
+    ("exponential", ExponentialDistribution),
+    ("deterministic", DeterministicDistribution),
+    ("uniform", UniformDistribution),
+    ("hyperexponential", HyperexponentialDistribution),
+    ("lognormal", LognormalDistribution),
+    ("weibull", WeibullDistribution),
+    ("pareto", ParetoDistribution),
+    ("empirical", EmpiricalDistribution),
+    ("discrete", DiscreteDistribution),
+])
+
+
+def register_distribution(name: str, distribution_class):
+    """
+    Makes 'distribution_class' available in the config as 'type: name'
+    """
+    DISTRIBUTIONS[name] = distribution_class
+
+
+def create_distribution(params: dict, default_type: str, rng: numpy.random.Generator = None) -> Distribution:
+    """
+    Creates distribution of the type named in 'params' ('default_type' when not set)
+    """
+    name = params.get(TYPE_KEY, default_type)
+    if name not in DISTRIBUTIONS:
+        raise Exception("Unknown distribution type '{}'. Expected one of: {}".format(name, list(DISTRIBUTIONS.keys())))
+    return DISTRIBUTIONS[name].from_config(params, rng)
@@ -0,0 +1,39 @@
+import heapq
+import itertools
+
+from src.systemtime import VirtualClock
+
+
+class SimulationEngine:
+    """
+    Discrete-event scheduler. Keeps a heap of timestamped actions and executes
+    them in time order, moving the virtual clock to each event time.
+    Events scheduled for the same moment are executed in scheduling order.
+    """
+
+    def __init__(self, clock: VirtualClock) -> None:
+        self._clock = clock
+        self._events = []
+        self._sequence = itertools.count()
+
+    @property
+    def now(self) -> float:
+        return self._clock.current_millis()
+
+    def schedule(self, delay: float, action, *args):
+        """
+        Schedules 'action(*args)' to be executed in 'delay' millis of simulated time
+        """
+        if delay < 0:
+            raise Exception("Event can't be scheduled in the past. Delay: {}".format(delay))
+        heapq.heappush(self._events, (self.now + delay, next(self._sequence), action, args))
+
+    def run(self):
+        """
+        Executes events until there is nothing left to do
+        """
+        events = self._events
+        while events:
+            time, _, action, args = heapq.heappop(events)
+            self._clock.advance_to(time)
+            action(*args)
@@ -0,0 +1,147 @@
+import heapq
+import itertools
+from collections import OrderedDict
+from typing import Dict
+
+import numpy
+
+from src.distribution import UniformIntegerDistribution
+from src.job.jobs import Job
+
+CENTRAL_DISPATCH = "central"  # a single queue shared by the servers, no policy
+
+HEAP_SLACK = 4  # the heap of server loads is rebuilt once it is that many times larger than the pool
+
+
+class DispatchPolicy:
+    """
+    Picks the server an arriving job is sent to, when every server has a queue
+    of its own. Servers are given as their relative speeds keyed by server id;
+    the manager reports every change of the number of jobs at a server
+    (processed and queued ones).
+    """
+
+    def __init__(self, speeds: Dict[object, float], rng: numpy.random.Generator = None) -> None:
+        self._speeds = speeds
+        self._ids = list(speeds.keys())
+        self._jobs = {server_id: 0 for server_id in self._ids}
+
+    def jobs_changed(self, server_id, jobs: int):
+        self._jobs[server_id] = jobs
+
+    def select(self, job: Job):
+        """
+        Returns id of the server 'job' is sent to
+        """
+        raise Exception("Method select is not implemented for {} policy".format(self.__class__.__name__))
+
+
+class RoundRobinPolicy(DispatchPolicy):
+    """
+    Servers in turn, regardless of their load
+    """
+
+    def __init__(self, speeds: Dict[object, float], rng: numpy.random.Generator = None) -> None:
+        super().__init__(speeds, rng)
+        self._order = itertools.cycle(self._ids)
+
+    def select(self, job: Job):
+        return next(self._order)
+
+
+class PowerOfTwoPolicy(DispatchPolicy):
+    """
+    The server with fewer jobs of two picked at random (the first one of equal).
+    Takes O(1) time and does nearly as well as the shortest queue.
+    """
+
+    def __init__(self, speeds: Dict[object, float], rng: numpy.random.Generator = None) -> None:
+        super().__init__(speeds, rng)
+        self._first = UniformIntegerDistribution(0, len(self._ids) - 1, rng)
+        self._second = UniformIntegerDistribution(0, max(len(self._ids) - 2, 0), rng)
+
+    def select(self, job: Job):
+        if len(self._ids) == 1:
+            return self._ids[0]
+        first = self._first.next_random()
+        second = self._second.next_random()
+        if second >= first:  # a different server
+            second = second + 1
+        first, second = self._ids[first], self._ids[second]
+        return second if self._jobs[second] < self._jobs[first] else first
+
+
+class LoadHeapPolicy(DispatchPolicy):
+    """
+    The server of the lowest 'load' (the first one of equal). Loads are kept
+    in a heap updated on every change of jobs number, so a job is dispatched
+    in O(log n); outdated entries are skipped lazily.
+    """
+
+    def __init__(self, speeds: Dict[object, float], rng: numpy.random.Generator = None) -> None:
+        super().__init__(speeds, rng)
+        self._index = {server_id: index for index, server_id in enumerate(self._ids)}  # breaks ties
+        self._heap = []
+        self._rebuild()
+
+    def load(self, server_id, jobs: int) -> float:
+        raise Exception("Method load is not implemented for {} policy".format(self.__class__.__name__))
+
+    def jobs_changed(self, server_id, jobs: int):
+        super().jobs_changed(server_id, jobs)
+        heapq.heappush(self._heap, (self.load(server_id, jobs), self._index[server_id], server_id, jobs))
+        if len(self._heap) > HEAP_SLACK * len(self._ids):
+            self._rebuild()
+
+    def select(self, job: Job):
+        heap = self._heap
+        while heap[0][3] != self._jobs[heap[0][2]]:  # jobs number changed since
+            heapq.heappop(heap)
+        return heap[0][2]
+
+    def _rebuild(self):
+        self._heap = [(self.load(server_id, self._jobs[server_id]), index, server_id, self._jobs[server_id])
+                      for index, server_id in enumerate(self._ids)]
+        heapq.heapify(self._heap)
+
+
+class ShortestQueuePolicy(LoadHeapPolicy):
+    """
+    Join the shortest queue: the server with the fewest jobs
+    """
+
+    def load(self, server_id, jobs: int) -> float:
+        return jobs
+
+
+class LeastLoadedPolicy(LoadHeapPolicy):
+    """
+    The server which would finish the job first, taking its speed into
+    account: the fewest jobs per speed including the arriving one
+    """
+
+    def load(self, server_id, jobs: int) -> float:
+        return (jobs + 1) / self._speeds[server_id]
+
+
+DISPATCH_POLICIES = OrderedDict([
+    ("round-robin", RoundRobinPolicy),
+    ("power-of-two", PowerOfTwoPolicy),
+    ("shortest-queue", ShortestQueuePolicy),
+    ("least-loaded", LeastLoadedPolicy),
+])
+
+
+def register_dispatch_policy(name: str, policy_class):
+    """
+    Makes 'policy_class' available in the config as 'dispatchPolicy: name'
+    """
+    DISPATCH_POLICIES[name] = policy_class
+
+
+def create_dispatch_policy(name: str, speeds: Dict[object, float],
+                           rng: numpy.random.Generator = None) -> DispatchPolicy:
+    if name not in DISPATCH_POLICIES:
+        raise Exception("Unknown dispatch policy '{}'. Expected one of: {}".format(
+            name, [CENTRAL_DISPATCH] + list(DISPATCH_POLICIES.keys())))
+    return DISPATCH_POLICIES[name](speeds, rng)
@@ -1,11 +1,29 @@
+import logging
 import threading
 
+logger = logging.getLogger(__name__)
 
-class Job:
 
-    def __init__(self, id, priority) -> None:
+class Job:
+    """
+    Job record. Slots keep it compact, as millions of jobs are created in
+    long runs. Timestamps of the job life (ms of the statistics clock, None
+    until the moment happens) are plain attributes set by the statistics:
+    arrival_time (with auto warm-up only), queued_time (entering the queue)
+    and start_time (of processing).
+    """
+
+    __slots__ = ("_id", "_priority", "_processing_time", "_server_id",
+                 "arrival_time", "queued_time", "start_time")
+
+    def __init__(self, id, priority, processing_time=None) -> None:
         self._id = id
         self._priority = priority
+        self._processing_time = processing_time
+        self._server_id = None
+        self.arrival_time = None
+        self.queued_time = None
+        self.start_time = None
 
     @property
     def id(self):
@@ -15,6 +33,24 @@ class Job:
     def priority(self):
         return self._priority
 
+    @property
+    def processing_time(self):
+        """
+        Processing time the job needs (e.g. recorded in a trace), None when it is drawn by the server
+        """
+        return self._processing_time
+
+    @property
+    def server_id(self):
+        """
+        Id of the server the job was assigned to, None while it wasn't
+        """
+        return self._server_id
+
+    @server_id.setter
+    def server_id(self, value):
+        self._server_id = value
+
     def __str__(self) -> str:
         return "Job(id: {}, priority: {})".format(self._id, self._priority)
 
@@ -49,5 +85,5 @@ class JobGenerator:
         if not isinstance(priority, int):
             raise Exception("Priority should be an integer. Actual: {}".format(priority))
         job = Job(id_, priority)
-        print("JobGenerator: Generated job - {}".format(job))
+        logger.debug("JobGenerator: Generated job - %s", job)
         return job
@@ -1,42 +1,84 @@
+import heapq
+import logging
 import threading
-from typing import List
+from typing import List, Dict
 
+from src.job.dispatch import DispatchPolicy
 from src.job.jobs import Job
 from src.job.queue import JobStorage
 from src.job.server import JobProcessingServer
 from src.stats.eventbus import EventBus
-from src.systemtime import sleep
+
+logger = logging.getLogger(__name__)
+
+BUSY_HEAP_SLACK = 2  # the heap of busy servers is compacted once it is that many times larger than the pool
 
 
 class ServerLoadManager:
+    """
+    Assigns jobs to servers. Idle servers are kept in a heap ordered by speed,
+    so a job gets the fastest idle one (the first one of equal), and busy
+    servers in a heap ordered by the priority of their jobs, so a job finds an
+    idle server and a victim of preemption in O(log n): the server
+    running the least important job, the most recently started one of equal
+    jobs (it has done the least work). Heap entries of finished or replaced
+    jobs are skipped lazily.
+    """
 
-    def __init__(self, servers: List[JobProcessingServer], queue: JobStorage, eventbus: EventBus) -> None:
+    def __init__(self, servers: List[JobProcessingServer], queue: JobStorage, eventbus: EventBus,
+                 lock=None) -> None:
         self._servers_dict = {server.id: server for server in servers}
+        self._idle_order = {server.id: (-server.speed, index, server.id) for index, server in enumerate(servers)}
+        self._idle_servers = set(self._servers_dict.keys())  # ids of the servers in the idle heap
+        self._idle_heap = sorted(self._idle_order.values())
+        self._busy_servers = []  # heap of (-job priority, -assignment number, server id, job)
+        self._assignments = 0
         self._queue = queue
-        self._lock = threading.Lock()
+        self._lock = lock if lock is not None else threading.Lock()
+        self._condition = threading.Condition(self._lock)  # signalled on server release and stop
         self._stop = False
         self._eventbus = eventbus
 
+        for server in servers:
+            server.on_release(self.server_released)
+
     def run(self):
         # runs until stop command received and queue is cleared
-        while self._stop is not True or (self._stop is True and not self._queue.is_empty()):
-            self._try_pick_job_from_queue()
-            sleep(1)
-        print("Manager: Queue is empty, queue clearing thread stopped.")
+        with self._condition:
+            while self._stop is not True or not self._queue.is_empty():
+                self._try_pick_job_from_queue()
+                self._condition.wait()
+        logger.info("Manager: Queue is empty, queue clearing thread stopped.")
 
     def stop(self):
-        self._stop = True
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+
+    def server_released(self, server):
+        """
+        Is called by servers when they finish processing, so queued jobs are
+        picked up without polling
+        """
+        with self._condition:
+            # a threaded server releases outside its own lock, so it might have got another job since
+            if server.is_idle() and server.id not in self._idle_servers:
+                self._idle_servers.add(server.id)
+                heapq.heappush(self._idle_heap, self._idle_order[server.id])
+            self._try_pick_job_from_queue()
+            self._condition.notify_all()
 
     def _try_pick_job_from_queue(self):
-        with self._lock:
-            for server in list(self._servers_dict.values()):
-                if server.is_idle():
-                    job, exist = self._queue.pop()
-                    if exist:
-                        print("Manager: Picking job {} from queue to {} server (queue size = {})"
-                              .format(job, server.id, self._queue.size()))
-                        self._eventbus.job_pop_from_queue(job)
-                        server.job = job
+        # should be called holding the lock
+        while self._idle_servers:
+            job, exist = self._queue.pop()
+            if not exist:
+                break
+            server = self._pop_idle_server()
+            logger.debug("Manager: Picking job %s from queue to %s server (queue size = %s)",
+                         job, server.id, self._queue.size())
+            self._eventbus.job_pop_from_queue(job)
+            self._start(server, job)
 
     def schedule(self, job: Job) -> bool:
         with self._lock:
@@ -51,33 +93,158 @@ class ServerLoadManager:
     def _queue_job(self, job: Job) -> bool:
         dropped, success = self._queue.add(job)
         if not success:
-            print("Manager: Job {} was dropped since queue is full (queue size = {})"
-                  .format(job.id, self._queue.size()))
+            logger.debug("Manager: Job %s was dropped since queue is full (queue size = %s)",
+                         job.id, self._queue.size())
+            self._eventbus.job_rejected(job)
         elif success and dropped is not None:
-            print("Manager: {} was removed from queue since the {} has higher priority (queue size = {})"
-                  .format(dropped, job, self._queue.size()))
+            logger.debug("Manager: %s was removed from queue since the %s has higher priority (queue size = %s)",
+                         dropped, job, self._queue.size())
             self._eventbus.job_dropped_from_queue(dropped)
             self._eventbus.job_queued(job)
         else:
-            print("Manager: {} was queued (queue size = {})".format(job, self._queue.size()))
+            logger.debug("Manager: %s was queued (queue size = %s)", job, self._queue.size())
             self._eventbus.job_queued(job)
         return success
 
     def _assign_server(self, job: Job):
-        found_server = False
-        for server in list(self._servers_dict.values()):
-            if server.is_idle():
-                print("Manager: Processing job {} directly by {} server".format(job.id, server.id))
+        if self._idle_servers:
+            server = self._pop_idle_server()
+            logger.debug("Manager: Processing job %s directly by %s server", job.id, server.id)
+            self._start(server, job)
+            return True
+
+        # idle server wasn't found, looking for a server which processing lower priority job
+        server = self._preemption_victim(job)
+        if server is None:
+            return False
+        heapq.heappop(self._busy_servers)
+        self._eventbus.job_processing_aborted(server.job)
+        self._start(server, job)
+        return True
+
+    def _pop_idle_server(self):
+        server_id = heapq.heappop(self._idle_heap)[2]
+        self._idle_servers.remove(server_id)
+        return self._servers_dict[server_id]
+
+    def _start(self, server, job: Job):
+        server.job = job
+        self._assignments = self._assignments + 1
+        heapq.heappush(self._busy_servers, (-job.priority, -self._assignments, server.id, job))
+        if len(self._busy_servers) > BUSY_HEAP_SLACK * len(self._servers_dict):
+            self._busy_servers = [entry for entry in self._busy_servers
+                                  if self._servers_dict[entry[2]].job is entry[3]]
+            heapq.heapify(self._busy_servers)
+
+    def _preemption_victim(self, job: Job):
+        """
+        Returns the server of the least important job when it is less important than 'job', None otherwise
+        """
+        heap = self._busy_servers
+        while heap:
+            _, _, server_id, running = heap[0]
+            server = self._servers_dict[server_id]
+            if server.job is not running:  # finished or replaced since
+                heapq.heappop(heap)
+                continue
+            return server if running.priority > job.priority else None
+        return None
+
+
+class DispatchingLoadManager:
+    """
+    Sends every arriving job to the server picked by the dispatch policy,
+    where it waits in the server's own queue; a released server takes the next
+    job of its own queue only. A job more important than the one its server
+    processes preempts it, like with the shared queue.
+    """
+
+    def __init__(self, servers: List[JobProcessingServer], queues: Dict[object, JobStorage], eventbus: EventBus,
+                 policy: DispatchPolicy, lock=None) -> None:
+        self._servers_dict = {server.id: server for server in servers}
+        self._idle_servers = set(self._servers_dict.keys())
+        self._queues = queues  # server id to its queue
+        self._jobs = {server.id: 0 for server in servers}  # processed and queued jobs of every server
+        self._queued_jobs = 0
+        self._policy = policy
+        self._lock = lock if lock is not None else threading.Lock()
+        self._condition = threading.Condition(self._lock)  # signalled on server release and stop
+        self._stop = False
+        self._eventbus = eventbus
+
+        for server in servers:
+            server.on_release(self.server_released)
+
+    def run(self):
+        # runs until stop command received and queues are cleared, jobs are picked up on server release
+        with self._condition:
+            while self._stop is not True or self._queued_jobs > 0:
+                self._condition.wait()
+        logger.info("Manager: Queues are empty, queue clearing thread stopped.")
+
+    def stop(self):
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+
+    def server_released(self, server):
+        with self._condition:
+            self._jobs_changed(server.id, -1)
+            if server.is_idle():  # it might have got another job since, see ServerLoadManager.server_released
+                self._idle_servers.add(server.id)
+                self._try_pick_job_from_queue(server)
+            self._condition.notify_all()
+
+    def schedule(self, job: Job) -> bool:
+        with self._lock:
+            server = self._servers_dict[self._policy.select(job)]
+            running = server.job
+            if server.id in self._idle_servers:
+                logger.debug("Manager: Processing job %s directly by %s server", job.id, server.id)
+                self._idle_servers.discard(server.id)
                 server.job = job
-                found_server = True
-                break
+                self._jobs_changed(server.id, 1)
+                scheduled = True
+            elif running is not None and running.priority > job.priority:
+                self._eventbus.job_processing_aborted(running)
+                server.job = job
+                scheduled = True
+            else:
+                scheduled = self._queue_job(server, job)
+            if scheduled:
+                self._eventbus.job_schedule(job)
+
+            return scheduled
 
-        if not found_server:  # idle server wasn't found, looking for a server which processing lower priority job
-            for server in list(self._servers_dict.values()):
-                if server.job.priority > job.priority:
-                    self._eventbus.job_processing_aborted(server.job)
-                    server.job = job
-                    found_server = True
-                    break
+    def _try_pick_job_from_queue(self, server):
+        # should be called holding the lock
+        job, exist = self._queues[server.id].pop()
+        if exist:
+            self._queued_jobs = self._queued_jobs - 1
+            logger.debug("Manager: Picking job %s from queue of %s server (queue size = %s)",
+                         job, server.id, self._queues[server.id].size())
+            self._eventbus.job_pop_from_queue(job)
+            self._idle_servers.discard(server.id)
+            server.job = job  # the job was counted when queued
+
+    def _queue_job(self, server, job: Job) -> bool:
+        queue = self._queues[server.id]
+        dropped, success = queue.add(job)
+        if not success:
+            logger.debug("Manager: Job %s was dropped since queue of %s server is full", job.id, server.id)
+            self._eventbus.job_rejected(job)
+        elif dropped is not None:
+            logger.debug("Manager: %s was removed from queue of %s server since the %s has higher priority",
+                         dropped, server.id, job)
+            self._eventbus.job_dropped_from_queue(dropped)
+            self._eventbus.job_queued(job)
+        else:
+            logger.debug("Manager: %s was queued to %s server (queue size = %s)", job, server.id, queue.size())
+            self._queued_jobs = self._queued_jobs + 1
+            self._eventbus.job_queued(job)
+            self._jobs_changed(server.id, 1)
+        return success
 
-        return found_server
+    def _jobs_changed(self, server_id, delta: int):
+        self._jobs[server_id] = self._jobs[server_id] + delta
+        self._policy.jobs_changed(server_id, self._jobs[server_id])
@@ -6,10 +6,22 @@ from src.job.jobs import Job
 
 
 class PriorityQueue:
+    """
+    Bounded priority queue. Jobs with lower priority value are served first,
+    jobs of equal priority are served in arrival order. When the queue is full
+    the job with the highest priority value (the newest of them) is evicted to
+    make room for a more important one.
+
+    Keeps a min-heap for serving and a max-heap for eviction over the same
+    entries, removing entries lazily, so both operations are O(log n).
+    """
 
     def __init__(self, maxsize) -> None:
         self._maxsize = maxsize
-        self._data = []
+        self._size = 0
+        self._sequence = 0  # arrival order, breaks ties between equal priorities
+        self._min_heap = []  # [priority, sequence, job]; job is None when entry was removed
+        self._max_heap = []  # (-priority, -sequence, entry)
 
     def put(self, job: Job) -> Tuple[Job, bool]:
         """
@@ -19,36 +31,75 @@ class PriorityQueue:
         """
         success = False
         dropped_job = None
-        if len(self._data) < self._maxsize:
-            heapq.heappush(self._data, job)
+        if self._size < self._maxsize:
+            self._push(job)
             success = True
-        elif max(self._data).priority > job.priority:
-            lowest_priority = max(self._data)
-            self._data.remove(lowest_priority)
-            dropped_job = lowest_priority
-            heapq.heapify(self._data)
-            heapq.heappush(self._data, job)
+        elif self._maxsize > 0 and self._peek_lowest()[0] > job.priority:
+            dropped_job = self._pop_lowest()
+            self._push(job)
             success = True
         return dropped_job, success
 
-    def pop(self):
-        return heapq.heappop(self._data)
+    def pop(self) -> Job:
+        heap = self._min_heap
+        while True:
+            entry = heapq.heappop(heap)
+            if entry[2] is not None:
+                break
+        job = entry[2]
+        entry[2] = None
+        self._size = self._size - 1
+        self._compact()
+        return job
 
     def full(self):
-        return len(self._data) is self._maxsize
+        return self._size == self._maxsize
 
     def empty(self):
-        return len(self._data) is 0
+        return self._size == 0
 
     def size(self):
-        return len(self._data)
+        return self._size
+
+    def _push(self, job: Job):
+        self._sequence = self._sequence + 1
+        entry = [job.priority, self._sequence, job]
+        heapq.heappush(self._min_heap, entry)
+        heapq.heappush(self._max_heap, (-job.priority, -self._sequence, entry))
+        self._size = self._size + 1
+
+    def _peek_lowest(self) -> list:
+        heap = self._max_heap
+        while heap[0][2][2] is None:
+            heapq.heappop(heap)
+        return heap[0][2]
+
+    def _pop_lowest(self) -> Job:
+        entry = self._peek_lowest()
+        heapq.heappop(self._max_heap)
+        job = entry[2]
+        entry[2] = None
+        self._size = self._size - 1
+        self._compact()
+        return job
+
+    def _compact(self):
+        # removed entries stay in the other heap until they reach its top;
+        # rebuild a heap once they outnumber live entries, so memory stays O(maxsize)
+        limit = 2 * self._size + 16
+        if len(self._min_heap) > limit:
+            self._min_heap = [entry for entry in self._min_heap if entry[2] is not None]
+            heapq.heapify(self._min_heap)
+        if len(self._max_heap) > limit:
+            self._max_heap = [item for item in self._max_heap if item[2][2] is not None]
+            heapq.heapify(self._max_heap)
 
 
 class JobStorage:
 
-    def __init__(self, queue_size) -> None:
+    def __init__(self, queue_size, lock=None) -> None:
         self._queue = PriorityQueue(maxsize=queue_size)
-        self._lock = threading.Lock()
+        self._lock = lock if lock is not None else threading.Lock()
 
     def add(self, job: Job) -> Tuple[Job, bool]:
         with self._lock:
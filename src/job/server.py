@@ -1,25 +1,50 @@
+import asyncio
+import logging
 import threading
 
 from src.distribution import Distribution
+from src.engine import SimulationEngine
 from src.job.jobs import Job
 from src.stats.eventbus import EventBus
-from src.systemtime import sleep, Stopwatch
+from src.systemtime import Stopwatch
+
+logger = logging.getLogger(__name__)
+
+
+def processing_time(job: Job, distribution: Distribution, speed: float = 1.0) -> float:
+    """
+    Returns processing time of the job: its own one when it is set, otherwise
+    drawn from the distribution; divided by the relative speed of the server
+    """
+    if job.processing_time is not None:
+        return job.processing_time / speed
+    return distribution.next_random() / speed
 
 
 class JobProcessingServer:
 
-    def __init__(self, processing_distribution: Distribution, id_, eventbus: EventBus) -> None:
+    def __init__(self, processing_distribution: Distribution, id_, eventbus: EventBus, speed: float = 1.0) -> None:
         self._distribution = processing_distribution
+        self._speed = speed
         self._stop = False
         self._job = None
         self._id = id_
         self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)  # signalled on job assignment and stop
         self._eventbus = eventbus
+        self._release_callback = None
 
     @property
     def id(self):
         return self._id
 
+    @property
+    def speed(self) -> float:
+        """
+        Relative speed of the server, processing time is divided by it
+        """
+        return self._speed
+
     def is_idle(self) -> bool:
         return self._job is None
 
@@ -29,40 +54,212 @@ class JobProcessingServer:
 
     @job.setter
     def job(self, value: Job):
-        with self._lock:
+        with self._condition:
+            value.server_id = self._id
             self._eventbus.job_process_start(value)
             self._job = value
+            self._condition.notify_all()
+
+    def on_release(self, callback):
+        """
+        Registers callback which is called with the server once it becomes idle
+        """
+        self._release_callback = callback
 
     def run(self):
-        self._log("Server was started...")
-        while self._stop is not True:
+        logger.debug("Server %s: Server was started...", self._id)
+        while True:
+            with self._condition:
+                while self._job is None and self._stop is not True:
+                    self._condition.wait()
+                job = self._job
+            if job is None:
+                break
+            self._process(job)
+        logger.debug("Server %s: Server was stopped!", self._id)
+
+    def stop(self):
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+
+    def _process(self, job: Job) -> bool:
+        duration = processing_time(job, self._distribution, self._speed)
+        logger.debug("Server %s: Processing %s...", self._id, job)
+        stopwatch = Stopwatch()
+        with self._condition:
+            # wakes up either when processing time is over or when the job is replaced by a more important one
+            aborted = self._condition.wait_for(lambda: self._job is not job, duration / 1000)
+            if not aborted:
+                self._eventbus.job_was_processed(job)
+                self._job = None
+        if not aborted:
+            logger.debug("Server %s: Job '%s' was processed for %s", self._id, job.id, stopwatch.elapsed())
+            if self._release_callback is not None:
+                self._release_callback(self)
+        else:
+            logger.debug("Server %s: Processing of %s was aborted to start processing of %s with higher priority",
+                         self._id, job, self.job)
+        return not aborted
+
+
+class AsyncJobProcessingServer:
+    """
+    Server of the asyncio mode. Runs as a coroutine on the event loop, which is
+    woken up on job assignment and stop.
+    """
+
+    def __init__(self, processing_distribution: Distribution, id_, eventbus: EventBus, speed: float = 1.0) -> None:
+        self._distribution = processing_distribution
+        self._speed = speed
+        self._stop = False
+        self._job = None
+        self._id = id_
+        self._wakeup = None  # created by 'run', so it belongs to the loop the server runs on
+        self._eventbus = eventbus
+        self._release_callback = None
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def speed(self) -> float:
+        """
+        Relative speed of the server, processing time is divided by it
+        """
+        return self._speed
+
+    def is_idle(self) -> bool:
+        return self._job is None
+
+    @property
+    def job(self):
+        return self._job
+
+    @job.setter
+    def job(self, value: Job):
+        value.server_id = self._id
+        self._eventbus.job_process_start(value)
+        self._job = value
+        self._wake_up()
+
+    def on_release(self, callback):
+        """
+        Registers callback which is called with the server once it becomes idle
+        """
+        self._release_callback = callback
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        logger.debug("Server %s: Server was started...", self._id)
+        while True:
+            while self._job is None and self._stop is not True:
+                self._wakeup.clear()
+                await self._wakeup.wait()
             job = self._job
-            if job is not None:
-                if self._process(job):
-                    self._job = None
-            sleep(1)
-        self._log("Server was stopped!")
+            if job is None:
+                break
+            await self._process(job)
+        logger.debug("Server %s: Server was stopped!", self._id)
 
     def stop(self):
         self._stop = True
+        self._wake_up()
 
-    def _process(self, job: Job) -> bool:
-        duration = int(self._distribution.next_random())
-        self._log("Processing {}...".format(job))
+    def _wake_up(self):
+        if self._wakeup is not None:  # otherwise 'run' hasn't started yet and sees the change once it starts
+            self._wakeup.set()
+
+    async def _process(self, job: Job) -> bool:
+        duration = processing_time(job, self._distribution, self._speed)
+        logger.debug("Server %s: Processing %s...", self._id, job)
         stopwatch = Stopwatch()
-        finished = True
-        while not stopwatch.is_elapsed(duration):
-            sleep(1)
-            if self._job.id is not job.id:
-                finished = False
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + duration / 1000
+        while self._job is job:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
                 break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+        finished = self._job is job
         if finished:
-            self._log("Job '{}' was processed for {}".format(job.id, stopwatch.elapsed()))
+            logger.debug("Server %s: Job '%s' was processed for %s", self._id, job.id, stopwatch.elapsed())
             self._eventbus.job_was_processed(job)
+            self._job = None
+            if self._release_callback is not None:
+                self._release_callback(self)
         else:
-            self._log("Processing of {} was aborted to start processing of {} with higher priority"
-                      .format(job, self.job))
+            logger.debug("Server %s: Processing of %s was aborted to start processing of %s with higher priority",
+                         self._id, job, self.job)
         return finished
 
-    def _log(self, msg):
-        print("Server {}: {}".format(self._id, msg))
+
+class SimulatedServer:
+    """
+    Server driven by the discrete-event engine. Instead of polling in its own
+    thread it schedules a completion event each time a job is assigned.
+    """
+
+    def __init__(self, processing_distribution: Distribution, id_, eventbus: EventBus,
+                 engine: SimulationEngine, speed: float = 1.0) -> None:
+        self._distribution = processing_distribution
+        self._speed = speed
+        self._job = None
+        self._id = id_
+        self._eventbus = eventbus
+        self._engine = engine
+        self._assignment = 0  # identifies current job assignment, so completion of aborted job is ignored
+        self._release_callback = None
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def speed(self) -> float:
+        """
+        Relative speed of the server, processing time is divided by it
+        """
+        return self._speed
+
+    def is_idle(self) -> bool:
+        return self._job is None
+
+    @property
+    def job(self):
+        return self._job
+
+    @job.setter
+    def job(self, value: Job):
+        value.server_id = self._id
+        self._eventbus.job_process_start(value)
+        if self._job is not None:
+            logger.debug("Server %s: Processing of %s was aborted to start processing of %s with higher priority",
+                         self._id, self._job, value)
+        self._job = value
+        self._assignment = self._assignment + 1
+
+        duration = processing_time(value, self._distribution, self._speed)
+        logger.debug("Server %s: Processing %s...", self._id, value)
+        self._engine.schedule(duration, self._finish, value, self._assignment, duration)
+
+    def on_release(self, callback):
+        """
+        Registers callback which is called with the server once it becomes idle
+        """
+        self._release_callback = callback
+
+    def _finish(self, job: Job, assignment: int, duration: float):
+        if assignment != self._assignment:
+            return  # processing was aborted
+        logger.debug("Server %s: Job '%s' was processed for %s", self._id, job.id, duration)
+        self._eventbus.job_was_processed(job)
+        self._job = None
+        if self._release_callback is not None:
+            self._release_callback(self)
@@ -0,0 +1,32 @@
+import logging
+import logging.handlers
+import sys
+
+LOG_FORMAT = "%(message)s"
+LOG_BUFFER_SIZE = 10000  # records kept in memory before they are written out
+
+
+def configure_logging(level: str = "INFO", buffer_size: int = LOG_BUFFER_SIZE):
+    """
+    Sets up output of the simulation log. Per-event messages are logged on
+    DEBUG level; with a higher level they are skipped before being formatted.
+    Per-event records are collected in memory and written in batches of
+    'buffer_size', a record of INFO level or higher flushes the batch at once.
+    """
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler = stream_handler
+    if buffer_size > 1:
+        handler = logging.handlers.MemoryHandler(buffer_size, logging.INFO, stream_handler)
+
+    root = logging.getLogger()
+    for old_handler in list(root.handlers):
+        root.removeHandler(old_handler)
+        old_handler.close()
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def flush_logging():
+    for handler in logging.getLogger().handlers:
+        handler.flush()
@@ -1,36 +1,73 @@
 import os
 from pathlib import Path
-from random import random
 
-from src.configuration import ConfigReader
-from src.job.jobs import JobGenerator, AtomicInteger
-from src.job.manager import ServerLoadManager
-from src.job.queue import JobStorage
-from src.job.server import JobProcessingServer
-from src.model import QueuingSystem
-from src.stats.eventbus import EventBus
-from src.stats.stats import SimulationStatistics
+from tabulate import tabulate
+
+from src.analytic import analytic_stats, analytic_model, get_comparison_stats, network_offered_loads
+from src.configuration import ConfigReader, ANALYTIC_OFF, ANALYTIC_ONLY
+from src.log import configure_logging
+from src.replication import ReplicationRunner, ComparisonRunner
+from src.runner import run_simulation, run_network
+from src.stats.steadystate import get_batch_means_stats
+from src.sweep import ParameterSweep
 
 if __name__ == '__main__':
-    conf_path = os.path.join(str(Path(__file__).parent.parent.joinpath()), "conf.yaml")
+    root_path = str(Path(__file__).parent.parent.joinpath())
+    conf_path = os.path.join(root_path, "conf.yaml")
+    configure_logging()
     config = ConfigReader(conf_path)
+    configure_logging(config.log_level, config.log_buffer_size)
 
-    input_dist = config.input_distribution
-    time_dist = config.process_time_distribution
-
-    id_gen = AtomicInteger()
-    job_generator = JobGenerator(lambda: id_gen.increment(), lambda: int(random() * 10) % 2 + 1)
-
-    eventbus = EventBus()
-    servers = [JobProcessingServer(time_dist, i + 1, eventbus) for i in range(config.servers_number)]
-    queue = JobStorage(config.queue_size)
-    manager = ServerLoadManager(servers, queue, eventbus)
-    stats = SimulationStatistics(queue, servers)
-    eventbus.add(stats)
-
-    system = QueuingSystem(input_dist, job_generator, config.simulation_duration, servers, manager, eventbus)
-    system.run()
-
-    table = stats.get_general_stats()
-    print("------- General Stats -------")
-    print(table)
+    if config.is_network():
+        offered_loads = network_offered_loads(config) if config.analytic != ANALYTIC_OFF else None
+        stats = run_network(config)
+        print("------- Station Stats -------")
+        print(stats.get_station_stats(offered_loads))
+        print("------- End-to-end Stats -------")
+        print(stats.get_general_stats())
+        print("Bottleneck: {} station".format(stats.bottleneck()))
+    elif config.is_sweep():
+        cache_path = os.path.join(root_path, config.sweep_cache) if config.sweep_cache else None
+        sweep = ParameterSweep(config, cache_path, config.seed)
+        results = sweep.run()
+        print("------- Sweep Stats -------")
+        print(ParameterSweep.get_sweep_stats(results))
+        if config.sweep_output:
+            ParameterSweep.write_csv(results, os.path.join(root_path, config.sweep_output))
+    elif config.compare_with:
+        alternative = config.with_parameters(config.compare_with)
+        runner = ComparisonRunner(config, alternative, config.replications, config.confidence_level, config.seed,
+                                  antithetic=config.antithetic)
+        results = runner.run()
+        print("------- Comparison with {} over {} replications -------".format(
+            dict(config.compare_with), config.replications))
+        print(runner.get_summary_stats(results))
+    elif config.replications > 1:
+        runner = ReplicationRunner(config, config.replications, config.confidence_level, config.seed,
+                                   antithetic=config.antithetic)
+        results = runner.run()
+        print("------- Stats of {} replications -------".format(config.replications))
+        print(runner.get_summary_stats(results))
+    else:
+        analytic = analytic_stats(config) if config.analytic != ANALYTIC_OFF else None
+        if analytic is not None and config.analytic == ANALYTIC_ONLY:
+            print("------- Analytic Stats ({}) -------".format(analytic_model(config)))
+            print(tabulate(analytic, numalign="right"))
+        else:
+            stats = run_simulation(config)
+            if config.batches > 0:
+                print("------- Batch means of {} batches of {:.0f} ms run -------".format(
+                    config.batches, stats.observed_duration()))
+                print(get_batch_means_stats(stats.batch_means_stats(config.batches, config.confidence_level),
+                                            config.confidence_level, analytic))
+            elif analytic is not None:
+                print("------- General Stats (analytic: {}) -------".format(analytic_model(config)))
+                print(get_comparison_stats(stats.general_stats(), analytic))
+            else:
+                print("------- General Stats -------")
+                print(stats.get_general_stats())
+            utilization = stats.server_utilization()
+            print("------- Server Utilization ({} dispatch) -------".format(config.dispatch_policy))
+            print(tabulate([[server_id, speed, utilization.get(server_id, 0.0)]
+                            for server_id, speed in enumerate(config.server_speeds, 1)],
+                           headers=["Server", "Speed", "Utilization (%)"], numalign="right"))
@@ -1,13 +1,20 @@
+import asyncio
+import logging
+import math
 import threading
+import time
 from typing import List
 
 from src.distribution import Distribution
+from src.engine import SimulationEngine
 from src.job.jobs import JobGenerator
 from src.job.manager import ServerLoadManager
-from src.job.server import JobProcessingServer
+from src.job.server import JobProcessingServer, SimulatedServer, AsyncJobProcessingServer
 from src.stats.eventbus import EventBus
 from src.systemtime import sleep, Stopwatch
 
+logger = logging.getLogger(__name__)
+
 
 class QueuingSystem:
 
@@ -22,6 +29,13 @@ class QueuingSystem:
         self._manager = manager
         self._manager_thread = None
         self._eventbus = eventbus
+        self._arrivals_stopped = False
+
+    def stop_arrivals(self):
+        """
+        Stops arrivals before the end of simulation duration, assigned and queued jobs are still processed
+        """
+        self._arrivals_stopped = True
 
     def run(self):
         server_to_thread_dict = {server.id: threading.Thread(target=server.run) for server in self._servers}
@@ -36,19 +50,20 @@ class QueuingSystem:
 
     def _start(self):
         stopwatch = Stopwatch()
-        while not stopwatch.is_elapsed(self._duration):
-            interval = int(self._interval_generator.next_random())
-            sleep(interval)
+        while not stopwatch.is_elapsed(self._duration) and not self._arrivals_stopped:
+            interval = self._interval_generator.next_random()
+            if math.isinf(interval):
+                break  # no more arrivals
+            sleep(int(interval))
 
             job = self._job_generator.next()
             self._eventbus.job_arrived(job)
             self._manager.schedule(job)
 
         self._stop()
-        self._eventbus.all_jobs_processed()
-        sleep(1000)  # since the printed lines order is not guaranteed, waiting some time for them to be flashed
+        self._eventbus.all_jobs_processed()  # returns once listeners got every event, with async dispatch too
         elapsed = stopwatch.elapsed()
-        print("System: Simulation took {} ms".format(elapsed))
+        logger.info("System: Simulation took %s ms", elapsed)
 
     def _stop(self):
         self._manager.stop()
@@ -64,9 +79,116 @@ class QueuingSystem:
         thread = self._server_to_thread_dict[server.id]
         QueuingSystem._wait_for_thread_stop(thread)
 
-        print("System: Server {} finished execution".format(server.id))
+        logger.debug("System: Server %s finished execution", server.id)
 
     @staticmethod
     def _wait_for_thread_stop(thread: threading.Thread):
-        while thread.is_alive():
-            sleep(1)
+        thread.join()
+
+
+class DiscreteEventQueuingSystem:
+    """
+    Same model as QueuingSystem, but executed by the discrete-event engine on
+    virtual time: arrivals and job completions are events, nothing sleeps.
+    """
+
+    def __init__(self, input_interval_generator: Distribution, job_generator: JobGenerator,
+                 simulation_duration, servers: List[SimulatedServer], manager: ServerLoadManager,
+                 eventbus: EventBus, engine: SimulationEngine) -> None:
+        self._job_generator = job_generator
+        self._interval_generator = input_interval_generator
+        self._duration = simulation_duration
+        self._servers = servers
+        self._manager = manager
+        self._eventbus = eventbus
+        self._engine = engine
+        self._arrivals_stopped = False
+
+    def stop_arrivals(self):
+        """
+        Stops arrivals before the end of simulation duration, assigned and queued jobs are still processed
+        """
+        self._arrivals_stopped = True
+
+    def run(self):
+        started = time.time()
+
+        self._schedule_next_arrival()
+        self._engine.run()  # arrivals stop after simulation duration (or when stopped), then remaining jobs are processed
+        self._eventbus.all_jobs_processed()
+
+        wall_time = int(round((time.time() - started) * 1000))
+        logger.info("System: Simulation of %d ms took %d ms", self._engine.now, wall_time)
+
+    def _schedule_next_arrival(self):
+        interval = self._interval_generator.next_random()
+        if self._engine.now + interval <= self._duration:
+            self._engine.schedule(interval, self._arrive)
+
+    def _arrive(self):
+        if self._arrivals_stopped:
+            return
+        job = self._job_generator.next()
+        self._eventbus.job_arrived(job)
+        self._manager.schedule(job)
+        self._schedule_next_arrival()
+
+
+class AsyncQueuingSystem:
+    """
+    Same model as QueuingSystem on wall-clock time, but the arrival loop and
+    every server are coroutines on a single asyncio event loop instead of
+    threads. Queued jobs are picked up by the manager from server release
+    callbacks, so it doesn't need a loop of its own.
+    """
+
+    def __init__(self, input_interval_generator: Distribution, job_generator: JobGenerator,
+                 simulation_duration, servers: List[AsyncJobProcessingServer], manager: ServerLoadManager,
+                 eventbus: EventBus) -> None:
+        self._job_generator = job_generator
+        self._interval_generator = input_interval_generator
+        self._duration = simulation_duration
+        self._servers = servers
+        self._manager = manager
+        self._eventbus = eventbus
+        self._arrivals_stopped = False
+
+    def stop_arrivals(self):
+        """
+        Stops arrivals before the end of simulation duration, assigned and queued jobs are still processed
+        """
+        self._arrivals_stopped = True
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._start())
+        finally:
+            loop.close()
+
+    async def _start(self):
+        stopwatch = Stopwatch()
+        server_tasks = [asyncio.ensure_future(server.run()) for server in self._servers]
+
+        loop = asyncio.get_event_loop()
+        arrival_time = loop.time()
+        while not stopwatch.is_elapsed(self._duration) and not self._arrivals_stopped:
+            # arrivals are planned on absolute time, so time spent on handling doesn't shift next ones
+            interval = self._interval_generator.next_random()
+            if math.isinf(interval):
+                break  # no more arrivals
+            arrival_time = arrival_time + interval / 1000
+            await asyncio.sleep(max(0.0, arrival_time - loop.time()))
+
+            job = self._job_generator.next()
+            self._eventbus.job_arrived(job)
+            self._manager.schedule(job)
+
+        # no more arrivals: servers finish assigned and queued jobs and exit
+        for server in self._servers:
+            server.stop()
+        await asyncio.gather(*server_tasks)
+        self._manager.stop()
+
+        self._eventbus.all_jobs_processed()
+        logger.info("System: Simulation took %s ms", stopwatch.elapsed())
@@ -0,0 +1,181 @@
+import logging
+import time
+from typing import List, Dict
+
+import numpy
+
+from src.distribution import Distribution, DiscreteDistribution
+from src.engine import SimulationEngine
+from src.job.jobs import JobGenerator
+from src.job.manager import ServerLoadManager
+from src.stats.eventbus import EventBus, Listener
+from src.stats.network import NetworkStatistics
+from src.stats.stats import SimulationStatistics
+
+logger = logging.getLogger(__name__)
+
+
+def routing_matrix(stations: List[str], routing: Dict[str, Dict[str, float]]) -> numpy.ndarray:
+    """
+    Returns matrix of probabilities to move from the station of the row to the station of the column
+    """
+    matrix = numpy.zeros((len(stations), len(stations)))
+    for station, probabilities in routing.items():
+        for next_station, probability in probabilities.items():
+            matrix[stations.index(station), stations.index(next_station)] = probability
+    return matrix
+
+
+def traffic_equations(external_rates: List[float], matrix: numpy.ndarray) -> numpy.ndarray:
+    """
+    Solves traffic equations of an open network: rate of arrivals to every
+    station is its external rate plus the rates routed from other stations
+    """
+    try:
+        rates = numpy.linalg.solve(numpy.eye(len(external_rates)) - matrix.T, external_rates)
+    except numpy.linalg.LinAlgError:
+        rates = None
+    if rates is None or numpy.any(rates < -1e-9):
+        raise Exception("Jobs should be able to leave the network. Routing: {}".format(matrix.tolist()))
+    return rates
+
+
+def routing_distribution(probabilities: Dict[str, float], stations: List[str],
+                         rng: numpy.random.Generator = None) -> Distribution:
+    """
+    Returns distribution of the index of the next station, where len(stations)
+    stands for leaving the network (the rest of the probability)
+    """
+    values = [stations.index(station) for station in probabilities.keys()] + [len(stations)]
+    leave = max(0.0, 1.0 - sum(probabilities.values()))
+    return DiscreteDistribution(values, list(probabilities.values()) + [leave], rng)
+
+
+class Station:
+    """
+    Servers, queue manager and statistics of a network station. Every station
+    has an event bus of its own, so its statistics cover it alone.
+    """
+
+    def __init__(self, name: str, manager: ServerLoadManager, eventbus: EventBus, stats: SimulationStatistics) -> None:
+        self._name = name
+        self._manager = manager
+        self._eventbus = eventbus
+        self._stats = stats
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def manager(self) -> ServerLoadManager:
+        return self._manager
+
+    @property
+    def eventbus(self) -> EventBus:
+        return self._eventbus
+
+    @property
+    def stats(self) -> SimulationStatistics:
+        return self._stats
+
+
+class StationRouter(Listener):
+    """
+    Hands jobs processed by a station over to the network, and reports jobs lost there
+    """
+
+    def __init__(self, network: 'NetworkQueuingSystem', station: int) -> None:
+        self._network = network
+        self._station = station
+
+    def job_was_processed(self, job):
+        self._network.job_processed(self._station, job)
+
+    def job_processing_aborted(self, job):
+        self._network.job_lost(job)
+
+    def job_dropped_from_queue(self, job):
+        self._network.job_lost(job)
+
+    def job_rejected(self, job):
+        self._network.job_lost(job)
+
+
+class NetworkQueuingSystem:
+    """
+    Open network of stations on a single discrete-event engine. External
+    arrivals enter a station drawn from 'entry', and a job processed by a
+    station moves to the next one drawn from its 'routing' distribution
+    (None - the job leaves the network) or leaves. A job keeps its id and
+    priority across stations; routing happens at the moment of completion,
+    after the server is released.
+    """
+
+    def __init__(self, input_interval_generator: Distribution, job_generator: JobGenerator,
+                 simulation_duration, stations: List[Station], entry: Distribution,
+                 routing: List[Distribution], engine: SimulationEngine, stats: NetworkStatistics) -> None:
+        self._job_generator = job_generator
+        self._interval_generator = input_interval_generator
+        self._duration = simulation_duration
+        self._stations = stations
+        self._entry = entry
+        self._routing = routing
+        self._engine = engine
+        self._stats = stats
+        self._arrivals_stopped = False
+        for index, station in enumerate(stations):
+            station.eventbus.add(StationRouter(self, index))
+
+    def stop_arrivals(self):
+        """
+        Stops arrivals before the end of simulation duration, jobs in the network are still processed
+        """
+        self._arrivals_stopped = True
+
+    def run(self):
+        started = time.time()
+
+        self._schedule_next_arrival()
+        self._engine.run()  # arrivals stop after simulation duration, then jobs in the network are processed
+        for station in self._stations:
+            station.eventbus.all_jobs_processed()
+
+        wall_time = int(round((time.time() - started) * 1000))
+        logger.info("Network: Simulation of %d ms took %d ms", self._engine.now, wall_time)
+
+    def job_processed(self, station: int, job):
+        self._engine.schedule(0, self._route, station, job)
+
+    def job_lost(self, job):
+        logger.debug("Network: %s is lost", job)
+        self._stats.job_lost(job)
+
+    def _schedule_next_arrival(self):
+        interval = self._interval_generator.next_random()
+        if self._engine.now + interval <= self._duration:
+            self._engine.schedule(interval, self._arrive)
+
+    def _arrive(self):
+        if self._arrivals_stopped:
+            return
+        job = self._job_generator.next()
+        self._stats.job_entered(job)
+        self._enter(int(self._entry.next_random()), job)
+        self._schedule_next_arrival()
+
+    def _route(self, station: int, job):
+        routing = self._routing[station]
+        next_station = int(routing.next_random()) if routing is not None else len(self._stations)
+        if next_station == len(self._stations):
+            logger.debug("Network: %s left the network after %s station", job, self._stations[station].name)
+            self._stats.job_left(job)
+        else:
+            self._enter(next_station, job)
+
+    def _enter(self, index: int, job):
+        station = self._stations[index]
+        logger.debug("Network: %s entered %s station", job, station.name)
+        self._stats.job_visited(job)
+        station.eventbus.job_arrived(job)
+        station.manager.schedule(job)
@@ -0,0 +1,136 @@
+import cProfile
+import logging
+import threading
+import time
+from typing import List
+
+from tabulate import tabulate
+
+from src.job.queue import JobStorage
+from src.stats.eventbus import EventBus, Listener
+
+logger = logging.getLogger(__name__)
+
+LISTENER_EVENTS = [name for name, value in vars(Listener).items() if callable(value) and not name.startswith("_")]
+
+
+class Instrumentation:
+    """
+    Opt-in timing of simulation components: methods of the given objects are
+    replaced with wrappers which count calls and measure time spent in them
+    (inclusive of nested instrumented calls, e.g. event dispatch includes its
+    listeners). Objects which aren't instrumented run at full speed.
+    """
+
+    def __init__(self) -> None:
+        self._timings = {}  # name to [calls, total seconds]
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                self._timings[name] = [1, seconds]
+            else:
+                timing[0] = timing[0] + 1
+                timing[1] = timing[1] + seconds
+
+    def instrument(self, target, methods: List[str], name: str = None):
+        """
+        Times 'methods' of the 'target' object, recorded as 'name.method' ('name' defaults to the class name)
+        """
+        name = name if name is not None else type(target).__name__
+        for method in methods:
+            setattr(target, method, self._timed(getattr(target, method), "{}.{}".format(name, method)))
+
+    def lock(self, name: str) -> 'TimedLock':
+        """
+        Returns a lock which records time spent waiting to acquire it
+        """
+        return TimedLock(self, "{} lock wait".format(name))
+
+    def summary(self) -> List[list]:
+        """
+        Returns rows of name, number of calls, total time (ms) and mean time (us), the longest total first
+        """
+        with self._lock:
+            timings = sorted(self._timings.items(), key=lambda item: item[1][1], reverse=True)
+        return [[name, calls, total * 1000, total / calls * 1e6] for name, (calls, total) in timings]
+
+    def get_summary_stats(self) -> str:
+        return tabulate(self.summary(), headers=["Component", "Calls", "Total (ms)", "Mean (us)"], numalign="right")
+
+    def _timed(self, method, name: str):
+        record = self.record
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - started)
+
+        return timed
+
+
+class TimedLock:
+    """
+    Lock recording time spent by blocking acquisitions. Can back a threading.Condition.
+    """
+
+    def __init__(self, instrumentation: Instrumentation, name: str) -> None:
+        self._instrumentation = instrumentation
+        self._name = name
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if not blocking:
+            return self._lock.acquire(False)
+        started = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        self._instrumentation.record(self._name, time.perf_counter() - started)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def instrument_system(instrumentation: Instrumentation, manager, queues: List[JobStorage],
+                      eventbus: EventBus, listeners: List[Listener], input_dist, process_time_dists: list):
+    """
+    Times scheduling, queue operations, dispatch of every event type, every
+    listener and sampling of interval and processing time distributions
+    """
+    instrumentation.instrument(manager, ["schedule", "_try_pick_job_from_queue"])
+    for queue in queues:
+        instrumentation.instrument(queue, ["add", "pop"])
+    instrumentation.instrument(eventbus, LISTENER_EVENTS, "EventBus")
+    for listener in listeners:
+        instrumentation.instrument(listener, LISTENER_EVENTS)
+    instrumentation.instrument(input_dist, ["next_random"], "InputDistribution")
+    for distribution in process_time_dists:
+        instrumentation.instrument(distribution, ["next_random"], "ProcessTimeDistribution")
+
+
+def run_profiled(func, path: str):
+    """
+    Calls 'func' under cProfile and writes collected stats to 'path'. The file
+    is read by pstats and by flame graph tools (flameprof, snakeviz).
+    Only the calling thread is profiled.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info("Profiler: Stats are written to %s", path)
@@ -0,0 +1,79 @@
+import numpy
+
+ARRIVALS_STREAM = 0
+SERVICE_STREAM = 1
+PRIORITIES_STREAM = 2
+ROUTING_STREAM = 3
+STATION_SERVICE_STREAM = 4
+DISPATCH_STREAM = 5
+
+
+class AntitheticGenerator:
+    """
+    Generator returning the antithetic counterpart 1 - u of every uniform value u
+    of the wrapped generator. Distributions sample by inverse transform, so a
+    run on antithetic streams is negatively correlated with the plain run of the
+    same seed, and the average of the pair has lower variance than of two
+    independent runs.
+    """
+
+    def __init__(self, rng: numpy.random.Generator) -> None:
+        self._rng = rng
+
+    def random(self, size=None):
+        # stays in [0, 1) like the wrapped generator
+        return numpy.nextafter(1.0 - self._rng.random(size), 0.0)
+
+
+class RandomStreams:
+    """
+    Independent random streams of a simulation run derived from a single seed:
+    one for arrivals, one for priorities and one for processing time of each
+    server (of each station server and routing of each station in a network).
+    Streams are keyed by their purpose (and server id), not by creation
+    order, so the same component gets the same numbers in runs of different
+    configurations with the same seed (common random numbers).
+    """
+
+    def __init__(self, seed=None, antithetic: bool = False) -> None:
+        if isinstance(seed, numpy.random.SeedSequence):
+            self._seed = seed
+        else:
+            self._seed = numpy.random.SeedSequence(seed)
+        self._antithetic = antithetic
+
+    @property
+    def entropy(self):
+        """
+        Seed the streams were derived from, allows to reproduce the run
+        """
+        return self._seed.entropy
+
+    def arrivals(self) -> numpy.random.Generator:
+        return self._generator(ARRIVALS_STREAM)
+
+    def priorities(self) -> numpy.random.Generator:
+        return self._generator(PRIORITIES_STREAM)
+
+    def service(self, server_id: int) -> numpy.random.Generator:
+        return self._generator(SERVICE_STREAM, server_id)
+
+    def dispatch(self) -> numpy.random.Generator:
+        return self._generator(DISPATCH_STREAM)
+
+    def station_service(self, station: int, server_id: int) -> numpy.random.Generator:
+        """
+        Processing time stream of a server of the network station with index 'station'
+        """
+        return self._generator(STATION_SERVICE_STREAM, station, server_id)
+
+    def routing(self, station: int = None) -> numpy.random.Generator:
+        """
+        Stream of routing decisions after the network station with index 'station', of the entry station when not set
+        """
+        return self._generator(ROUTING_STREAM) if station is None else self._generator(ROUTING_STREAM, station + 1)
+
+    def _generator(self, *key) -> numpy.random.Generator:
+        seed = numpy.random.SeedSequence(self._seed.entropy, spawn_key=self._seed.spawn_key + key)
+        rng = numpy.random.default_rng(seed)
+        return AntitheticGenerator(rng) if self._antithetic else rng
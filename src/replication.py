@@ -0,0 +1,154 @@
+import logging
+import statistics
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import List, Tuple
+
+import numpy
+from tabulate import tabulate
+
+from src.configuration import ConfigReader
+from src.log import flush_logging
+from src.runner import run_simulation
+from src.stats.estimation import mean_confidence_interval
+
+
+def init_worker():
+    """
+    Initializes a worker process of the pool: only warnings are logged by replications
+    """
+    logging.disable(logging.INFO)
+
+
+def create_pool(workers: int = None) -> ProcessPoolExecutor:
+    flush_logging()  # otherwise buffered records are copied into forked workers
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+
+
+def run_replication(config: ConfigReader, seed: numpy.random.SeedSequence, antithetic: bool = False) -> List[list]:
+    """
+    Runs a single replication of the model and returns its general stats rows
+    """
+    stats = run_simulation(config, seed, antithetic)
+    return stats.general_stats()
+
+
+def average_rows(results: List[List[list]]) -> List[list]:
+    """
+    Returns general stats rows with values averaged over several runs
+    """
+    return [[name, sum(float(result[i][1]) for result in results) / len(results), unit]
+            for i, (name, _, unit) in enumerate(results[0])]
+
+
+class ReplicationRunner:
+    """
+    Runs independent replications of the same model across a process pool and
+    aggregates each metric into a mean and a confidence interval.
+
+    With 'antithetic' set, replications are run in pairs on plain and
+    antithetic streams of the same seed, and the average of each pair is a
+    single observation of the interval.
+    """
+
+    def __init__(self, config: ConfigReader, replications: int, confidence_level: float = 0.95,
+                 seed: int = None, workers: int = None, antithetic: bool = False) -> None:
+        if replications < 2:
+            raise Exception("At least 2 replications are required. Actual: {}".format(replications))
+        if antithetic and replications % 2 != 0:
+            raise Exception("Antithetic replications are run in pairs, their number should be even. "
+                            "Actual: {}".format(replications))
+        self._config = config
+        self._replications = replications
+        self._confidence_level = confidence_level
+        self._seed = seed
+        self._workers = workers
+        self._antithetic = antithetic
+
+    def run(self) -> List[List[list]]:
+        """
+        Returns general stats rows of every replication (of every antithetic pair)
+        """
+        seeds = self._spawn_seeds()
+        with create_pool(self._workers) as executor:
+            futures = self._submit(executor, self._config, seeds)
+            return self._collect(futures)
+
+    def _spawn_seeds(self) -> List[numpy.random.SeedSequence]:
+        observations = self._replications // 2 if self._antithetic else self._replications
+        return numpy.random.SeedSequence(self._seed).spawn(observations)
+
+    def _submit(self, executor: ProcessPoolExecutor, config: ConfigReader,
+                seeds: List[numpy.random.SeedSequence]) -> List[List[Future]]:
+        variants = [False, True] if self._antithetic else [False]
+        return [[executor.submit(run_replication, config, seed, antithetic) for antithetic in variants]
+                for seed in seeds]
+
+    @staticmethod
+    def _collect(futures: List[List[Future]]) -> List[List[list]]:
+        return [average_rows([future.result() for future in runs]) for runs in futures]
+
+    def summary(self, results: List[List[list]]) -> List[list]:
+        """
+        Returns rows of metric name, mean, confidence interval half-width and unit
+        """
+        rows = []
+        for i, (name, _, unit) in enumerate(results[0]):
+            values = [float(result[i][1]) for result in results]
+            mean, half_width = mean_confidence_interval(values, self._confidence_level)
+            rows.append([name, mean, half_width, unit])
+        return rows
+
+    def get_summary_stats(self, results: List[List[list]]) -> str:
+        headers = ["Metric", "Mean", "± ({:g}% CI)".format(self._confidence_level * 100), "Unit"]
+        return tabulate(self.summary(results), headers=headers, numalign="right")
+
+
+class ComparisonRunner(ReplicationRunner):
+    """
+    Runs replications of two models with common random numbers: both models
+    of a replication get the same seed, so arrivals, priorities and processing
+    times of a server are the same and their noise cancels out of the
+    difference. Each metric is reported with the confidence interval of the
+    difference and the variance reduction against independent runs (how many
+    times fewer replications reach the same interval).
+    """
+
+    def __init__(self, config: ConfigReader, alternative: ConfigReader, replications: int,
+                 confidence_level: float = 0.95, seed: int = None, workers: int = None,
+                 antithetic: bool = False) -> None:
+        super().__init__(config, replications, confidence_level, seed, workers, antithetic)
+        self._alternative = alternative
+
+    def run(self) -> Tuple[List[List[list]], List[List[list]]]:
+        """
+        Returns general stats rows of every replication of the model and of the alternative one
+        """
+        seeds = self._spawn_seeds()
+        with create_pool(self._workers) as executor:
+            futures = self._submit(executor, self._config, seeds)
+            alternative_futures = self._submit(executor, self._alternative, seeds)
+            return self._collect(futures), self._collect(alternative_futures)
+
+    def summary(self, results: Tuple[List[List[list]], List[List[list]]]) -> List[list]:
+        """
+        Returns rows of metric name, means of both models, mean difference,
+        its confidence interval half-width and variance, variance reduction and unit
+        """
+        baseline, alternative = results
+        rows = []
+        for i, (name, _, unit) in enumerate(baseline[0]):
+            values = [float(result[i][1]) for result in baseline]
+            alternative_values = [float(result[i][1]) for result in alternative]
+            differences = [b - a for a, b in zip(values, alternative_values)]
+            difference, half_width = mean_confidence_interval(differences, self._confidence_level)
+            variance = statistics.variance(differences)
+            independent_variance = statistics.variance(values) + statistics.variance(alternative_values)
+            reduction = independent_variance / variance if variance > 0 else None
+            rows.append([name, statistics.mean(values), statistics.mean(alternative_values),
+                         difference, half_width, variance, reduction, unit])
+        return rows
+
+    def get_summary_stats(self, results: Tuple[List[List[list]], List[List[list]]]) -> str:
+        headers = ["Metric", "Model", "Alternative", "Difference",
+                   "± ({:g}% CI)".format(self._confidence_level * 100), "Variance", "Reduction", "Unit"]
+        return tabulate(self.summary(results), headers=headers, numalign="right")
@@ -0,0 +1,172 @@
+import logging
+from collections import OrderedDict
+
+import numpy
+
+from src.configuration import ConfigReader, DISCRETE_MODE, ASYNCIO_MODE, ASYNC_DISPATCH, PROFILE_OFF, \
+    PROFILE_CPROFILE
+from src.distribution import UniformIntegerDistribution
+from src.engine import SimulationEngine
+from src.job.jobs import JobGenerator, AtomicInteger
+from src.job.dispatch import CENTRAL_DISPATCH, create_dispatch_policy
+from src.job.manager import ServerLoadManager, DispatchingLoadManager
+from src.job.queue import JobStorage
+from src.job.server import JobProcessingServer, SimulatedServer, AsyncJobProcessingServer
+from src.model import QueuingSystem, DiscreteEventQueuingSystem, AsyncQueuingSystem
+from src.network import Station, NetworkQueuingSystem, routing_distribution, routing_matrix, traffic_equations
+from src.profiling import Instrumentation, instrument_system, run_profiled
+from src.randomstreams import RandomStreams
+from src.stats.eventbus import EventBus, AsyncEventBus
+from src.stats.network import NetworkStatistics
+from src.stats.stats import SimulationStatistics
+from src.stats.steadystate import OBSERVATIONS
+from src.stats.stopping import PrecisionStoppingRule
+from src.systemtime import VirtualClock, SystemClock, use_clock
+from src.trace import TraceReplay, read_trace
+
+logger = logging.getLogger(__name__)
+
+
+def run_simulation(config: ConfigReader, seed: numpy.random.SeedSequence = None,
+                   antithetic: bool = False) -> SimulationStatistics:
+    """
+    Builds the queuing model described by 'config', runs it and returns collected statistics.
+    Random streams of the run are derived from 'seed', or from the configured seed when not set,
+    and yield antithetic values when 'antithetic' is set.
+    """
+    streams = RandomStreams(seed if seed is not None else config.seed, antithetic)
+    logger.info("System: Random seed %s%s", streams.entropy, " (antithetic)" if antithetic else "")
+
+    mode = config.simulation_mode
+    engine = None
+    if mode == DISCRETE_MODE:
+        clock = VirtualClock()
+        use_clock(clock)
+        engine = SimulationEngine(clock)
+    else:
+        use_clock(SystemClock())
+
+    profile = config.profile
+    instrumentation = Instrumentation() if profile != PROFILE_OFF else None
+    lock = instrumentation.lock if instrumentation is not None else lambda name: None
+
+    id_gen = AtomicInteger()
+    priority_dist = UniformIntegerDistribution(1, config.priority_levels, streams.priorities())
+    if config.trace is not None:
+        logger.info("System: Replaying jobs of %s", config.trace)
+        input_dist = job_generator = TraceReplay(read_trace(config.trace), id_gen.increment, priority_dist.next_random)
+    else:
+        input_dist = config.input_distribution(streams.arrivals())
+        job_generator = JobGenerator(lambda: id_gen.increment(), priority_dist.next_random)
+
+    if config.event_dispatch == ASYNC_DISPATCH:
+        eventbus = AsyncEventBus(config.event_buffer_size)
+    else:
+        eventbus = EventBus(lock("EventBus"))
+    servers_number = config.servers_number
+    servers = []
+    time_dists = []
+    for server_id, speed in zip(range(1, servers_number + 1), config.server_speeds):
+        time_dist = config.process_time_distribution(streams.service(server_id))
+        time_dists.append(time_dist)
+        if mode == DISCRETE_MODE:
+            servers.append(SimulatedServer(time_dist, server_id, eventbus, engine, speed))
+        elif mode == ASYNCIO_MODE:
+            servers.append(AsyncJobProcessingServer(time_dist, server_id, eventbus, speed))
+        else:
+            servers.append(JobProcessingServer(time_dist, server_id, eventbus, speed))
+    policy = config.dispatch_policy
+    if policy == CENTRAL_DISPATCH:
+        queues = OrderedDict([(None, JobStorage(config.queue_size, lock("JobStorage")))])
+        manager = ServerLoadManager(servers, queues[None], eventbus, lock("ServerLoadManager"))
+    else:
+        queues = OrderedDict((server.id, JobStorage(config.queue_size, lock("JobStorage"))) for server in servers)
+        dispatch = create_dispatch_policy(policy, OrderedDict((server.id, server.speed) for server in servers),
+                                          streams.dispatch())
+        manager = DispatchingLoadManager(servers, queues, eventbus, dispatch, lock("DispatchingLoadManager"))
+    duration = config.simulation_duration
+    warmup = config.warmup
+    stats = SimulationStatistics(eventbus.clock, servers_number, (duration - warmup) / OBSERVATIONS,
+                                 warmup, config.auto_warmup)
+    eventbus.add(stats)
+
+    if mode == DISCRETE_MODE:
+        system = DiscreteEventQueuingSystem(input_dist, job_generator, duration, servers, manager, eventbus, engine)
+    elif mode == ASYNCIO_MODE:
+        system = AsyncQueuingSystem(input_dist, job_generator, duration, servers, manager, eventbus)
+    else:
+        system = QueuingSystem(input_dist, job_generator, duration, servers, manager, eventbus)
+    rule = None
+    if config.precision:
+        rule = PrecisionStoppingRule(stats, config.precision, config.batches, config.confidence_level)
+        stats.on_observation(lambda observations: rule.observed(observations) and system.stop_arrivals())
+    if instrumentation is not None:
+        instrument_system(instrumentation, manager, list(queues.values()), eventbus, [stats], input_dist,
+                          time_dists)
+    if profile == PROFILE_CPROFILE:
+        run_profiled(system.run, config.profile_output)
+    else:
+        system.run()
+    if instrumentation is not None:
+        logger.info("System: Time spent per component (inclusive of nested calls)\n%s",
+                    instrumentation.get_summary_stats())
+    if rule is not None and not rule.reached:
+        logger.warning("System: Target precision is not reached within %d ms", duration)
+    return stats
+
+
+def run_network(config: ConfigReader, seed: numpy.random.SeedSequence = None,
+                antithetic: bool = False) -> NetworkStatistics:
+    """
+    Builds the network of stations described by 'config', runs it on the
+    discrete-event engine and returns collected statistics. Random streams
+    are derived the same way as by 'run_simulation'.
+    """
+    if config.simulation_mode != DISCRETE_MODE:
+        raise Exception("Network is simulated in {} mode only. Actual: {}".format(DISCRETE_MODE,
+                                                                                 config.simulation_mode))
+    if config.trace is not None:
+        raise Exception("Recorded jobs can't be replayed through a network")
+
+    streams = RandomStreams(seed if seed is not None else config.seed, antithetic)
+    logger.info("Network: Random seed %s%s", streams.entropy, " (antithetic)" if antithetic else "")
+    clock = VirtualClock()
+    use_clock(clock)
+    engine = SimulationEngine(clock)
+
+    names = config.stations
+    entry = config.network_entry
+    routing = config.network_routing
+    visits = traffic_equations([entry.get(name, 0.0) for name in names], routing_matrix(names, routing))
+    logger.info("Network: Expected visits per job - %s",
+                ", ".join("{} {:.3f}".format(name, ratio) for name, ratio in zip(names, visits)))
+
+    id_gen = AtomicInteger()
+    priority_dist = UniformIntegerDistribution(1, config.priority_levels, streams.priorities())
+    job_generator = JobGenerator(lambda: id_gen.increment(), priority_dist.next_random)
+    input_dist = config.input_distribution(streams.arrivals())
+
+    duration = config.simulation_duration
+    warmup = config.warmup
+    stations = []
+    for index, name in enumerate(names):
+        eventbus = EventBus()
+        servers = [SimulatedServer(config.station_process_time_distribution(name,
+                                                                            streams.station_service(index, server_id)),
+                                   server_id, eventbus, engine)
+                   for server_id in range(1, config.station_servers_number(name) + 1)]
+        manager = ServerLoadManager(servers, JobStorage(config.station_queue_size(name)), eventbus)
+        stats = SimulationStatistics(clock, len(servers), (duration - warmup) / OBSERVATIONS, warmup,
+                                     config.auto_warmup)
+        eventbus.add(stats)
+        stations.append(Station(name, manager, eventbus, stats))
+
+    network_stats = NetworkStatistics(clock, OrderedDict((station.name, station.stats) for station in stations),
+                                      warmup, config.auto_warmup)
+    station_routing = [routing_distribution(routing[name], names, streams.routing(index)) if name in routing else None
+                       for index, name in enumerate(names)]
+    system = NetworkQueuingSystem(input_dist, job_generator, duration, stations,
+                                  routing_distribution(entry, names, streams.routing()), station_routing, engine,
+                                  network_stats)
+    system.run()
+    return network_stats
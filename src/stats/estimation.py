@@ -0,0 +1,42 @@
+import math
+from statistics import NormalDist
+from typing import List, Tuple
+
+
+def t_quantile(probability: float, degrees_of_freedom: int) -> float:
+    """
+    Quantile of Student's t-distribution. Exact for 1 and 2 degrees of freedom,
+    Cornish-Fisher expansion around the normal quantile otherwise
+    (Abramowitz & Stegun 26.7.5).
+    """
+    if degrees_of_freedom < 1:
+        raise Exception("At least one degree of freedom is required. Actual: {}".format(degrees_of_freedom))
+    p = probability
+    if degrees_of_freedom == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if degrees_of_freedom == 2:
+        return (2 * p - 1) * math.sqrt(2 / (4 * p * (1 - p)))
+
+    z = NormalDist().inv_cdf(p)
+    v = float(degrees_of_freedom)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / v + g2 / v ** 2 + g3 / v ** 3 + g4 / v ** 4
+
+
+def mean_confidence_interval(values: List[float], confidence_level: float = 0.95) -> Tuple[float, float]:
+    """
+    Returns sample mean and half-width of its confidence interval.
+    Half-width is infinite when there are less than 2 values.
+    """
+    n = len(values)
+    if n == 0:
+        raise Exception("Can't estimate mean of an empty sample")
+    mean = sum(values) / n
+    if n < 2:
+        return mean, math.inf
+    variance = sum((x - mean) ** 2 for x in values) / (n - 1)
+    t = t_quantile(1 - (1 - confidence_level) / 2, n - 1)
+    return mean, t * math.sqrt(variance / n)
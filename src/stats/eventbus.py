@@ -1,4 +1,9 @@
 import threading
+from collections import deque
+
+from src.systemtime import Clock, get_clock, current_millis
+
+EVENT_BUFFER_SIZE = 65536
 
 
 class Listener:
@@ -21,6 +26,9 @@ class Listener:
     def job_dropped_from_queue(self, job):
         pass
 
+    def job_rejected(self, job):
+        pass
+
     def job_was_processed(self, job):
         pass
 
@@ -32,13 +40,20 @@ class Listener:
 
 
 class EventBus:
-    def __init__(self) -> None:
+    def __init__(self, lock=None) -> None:
         self._listeners = []
-        self._lock = threading.Lock()
+        self._lock = lock if lock is not None else threading.Lock()
 
     def add(self, listener: Listener):
         self._listeners.append(listener)
 
+    @property
+    def clock(self) -> Clock:
+        """
+        Clock listeners should measure time with, so measured time matches the moment the event happened
+        """
+        return get_clock()
+
     def job_arrived(self, job):
         with self._lock:
             for listener in self._listeners:
@@ -75,6 +90,14 @@ class EventBus:
             for listener in self._listeners:
                 listener.job_dropped_from_queue(job)
 
+    def job_rejected(self, job):
+        """
+        Arrived job was neither processed nor queued since the queue is full
+        """
+        with self._lock:
+            for listener in self._listeners:
+                listener.job_rejected(job)
+
     def job_process_start(self, job):
         """
         Job processing was started
@@ -98,3 +121,134 @@ class EventBus:
         with self._lock:
             for listener in self._listeners:
                 listener.all_jobs_processed()
+
+
+class EventClock(Clock):
+    """
+    Time of the event being dispatched by the AsyncEventBus
+    """
+
+    def __init__(self) -> None:
+        self.time = current_millis()  # until the first event is dispatched
+
+    def current_millis(self):
+        return self.time
+
+
+class AsyncEventBus(EventBus):
+    """
+    Publishes events without calling listeners. Events are stamped with the
+    current time and appended to a bounded buffer, which a dedicated worker
+    thread drains in batches, calling listeners outside the simulated system.
+    Publishers block only when the buffer is full. 'all_jobs_processed' waits
+    until every event is dispatched.
+
+    Listeners should take the state they need from events (not from the system
+    objects, which might be ahead) and measure time with 'clock'.
+    """
+
+    def __init__(self, capacity: int = EVENT_BUFFER_SIZE) -> None:
+        super().__init__()
+        self._capacity = capacity
+        self._buffer = deque()  # append and popleft are atomic, so publishers don't take a lock
+        self._event_clock = EventClock()
+
+        self._ready = threading.Event()
+        self._worker_idle = False
+        self._space = threading.Condition()
+        self._waiting_publishers = 0
+        self._error = None
+
+        self._worker = threading.Thread(target=self._dispatch, name="EventBus", daemon=True)
+        self._worker.start()
+
+    @property
+    def clock(self) -> Clock:
+        return self._event_clock
+
+    def job_arrived(self, job):
+        self._publish("job_arrived", job)
+
+    def job_schedule(self, job):
+        self._publish("job_schedule", job)
+
+    def job_processing_aborted(self, job):
+        self._publish("job_processing_aborted", job)
+
+    def job_queued(self, job):
+        self._publish("job_queued", job)
+
+    def job_pop_from_queue(self, job):
+        self._publish("job_pop_from_queue", job)
+
+    def job_dropped_from_queue(self, job):
+        self._publish("job_dropped_from_queue", job)
+
+    def job_rejected(self, job):
+        self._publish("job_rejected", job)
+
+    def job_process_start(self, job):
+        self._publish("job_process_start", job)
+
+    def job_was_processed(self, job):
+        self._publish("job_was_processed", job)
+
+    def all_jobs_processed(self):
+        """
+        Flushes all published events, it is the last event
+        """
+        self._publish("all_jobs_processed")
+        self._worker.join()
+        if self._error is not None:
+            raise self._error
+
+    def _publish(self, event, *args):
+        buffer = self._buffer
+        if len(buffer) >= self._capacity:
+            self._wait_for_space()
+        buffer.append((current_millis(), event, args))
+        if self._worker_idle:
+            self._ready.set()
+
+    def _wait_for_space(self):
+        with self._space:
+            self._waiting_publishers = self._waiting_publishers + 1
+            while len(self._buffer) >= self._capacity and self._worker.is_alive():
+                self._space.wait()
+            self._waiting_publishers = self._waiting_publishers - 1
+
+    def _dispatch(self):
+        buffer = self._buffer
+        clock = self._event_clock
+        handlers = {}
+        try:
+            while True:
+                if not buffer:
+                    self._wait_for_events()
+                    continue
+                while buffer:
+                    time, event, args = buffer.popleft()
+                    if event not in handlers:
+                        handlers[event] = [getattr(listener, event) for listener in self._listeners]
+                    clock.time = time
+                    for handler in handlers[event]:
+                        handler(*args)
+                    if event == "all_jobs_processed":
+                        return
+                    if self._waiting_publishers:
+                        with self._space:
+                            self._space.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._space:
+                self._space.notify_all()
+
+    def _wait_for_events(self):
+        # the flag is raised before the buffer is checked again, so a publisher
+        # appending after the check sees it and wakes the worker up
+        self._ready.clear()
+        self._worker_idle = True
+        if not self._buffer:
+            self._ready.wait()
+        self._worker_idle = False
@@ -1,120 +1,178 @@
-from typing import List
+import math
 
-from src.systemtime import Stopwatch
+from src.systemtime import Clock
 
+HISTOGRAM_PRECISION = 0.01  # relative width of a histogram bucket
 
-class JobProcessTimeMetric:
 
-    def __init__(self, job, process_time) -> None:
-        self._job = job
-        self._process_time = process_time
+class StreamingMetric:
+    """
+    Count, mean, variance, min and max of a stream of values, updated in O(1)
+    with Welford's algorithm without keeping the values.
+    """
 
-    @property
-    def process_time(self):
-        return self._process_time
-
-
-class LoadMetric:
     def __init__(self) -> None:
-        self._jobs_number = []
-
-    def add(self, queue_size: int):
-        self._jobs_number.append(queue_size)
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean
+        self._min = None
+        self._max = None
+
+    def add(self, value):
+        self._count = self._count + 1
+        delta = value - self._mean
+        self._mean = self._mean + delta / self._count
+        self._m2 = self._m2 + delta * (value - self._mean)
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
 
     @property
-    def load_values(self):
-        return self._jobs_number
-
-    def average_load(self) -> int:
-        return sum(self._jobs_number) / len(self._jobs_number) if len(self._jobs_number) is not 0 else 0
-
-
-class QueueSizeMetric:
-
-    def __init__(self) -> None:
-        self._sizes = []
-
-    def add(self, queue_size: int):
-        self._sizes.append(queue_size)
+    def count(self) -> int:
+        return self._count
 
     @property
-    def queue_sizes(self) -> List[int]:
-        return self._sizes
-
-    def average_queue_size(self) -> int:
-        return sum(self._sizes) / len(self._sizes) if len(self._sizes) is not 0 else 0
-
-
-class WaitTimeMetric:
-
-    def __init__(self, job, wait_time) -> None:
-        self._job = job
-        self._wait_time = wait_time
+    def mean(self) -> float:
+        return self._mean
 
     @property
-    def wait_time(self):
-        return self._wait_time
+    def variance(self) -> float:
+        return self._m2 / (self._count - 1) if self._count > 1 else 0.0
 
+    @property
+    def min(self):
+        return self._min
 
-IDLE = "IDLE"
-BUSY = "BUSY"
+    @property
+    def max(self):
+        return self._max
 
+    @property
+    def total(self) -> float:
+        return self._mean * self._count
+
+
+class Histogram:
+    """
+    Histogram with logarithmic buckets: every bucket is 'precision' wider than
+    the previous one, so percentiles have bounded relative error for any value
+    range while memory depends on the range only, not on the number of values.
+    """
+
+    def __init__(self, precision: float = HISTOGRAM_PRECISION) -> None:
+        self._log_base = math.log1p(precision)
+        self._base = 1 + precision
+        self._buckets = {}  # bucket index to number of values
+        self._zeros = 0  # values which are not positive
+        self._count = 0
+
+    def add(self, value):
+        self._count = self._count + 1
+        if value <= 0:
+            self._zeros = self._zeros + 1
+            return
+        index = math.floor(math.log(value) / self._log_base)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
 
-class SystemBusynessMetric:
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def merge(self, other: 'Histogram'):
+        """
+        Adds values of 'other' histogram of the same precision
+        """
+        self._count = self._count + other._count
+        self._zeros = self._zeros + other._zeros
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns approximate value below which 'percent' of values fall (midpoint of the bucket)
+        """
+        if self._count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(percent / 100 * self._count)))
+        seen = self._zeros
+        if seen >= rank:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen = seen + self._buckets[index]
+            if seen >= rank:
+                return (self._base ** index + self._base ** (index + 1)) / 2
+        return self._base ** (max(self._buckets) + 1)
+
+
+class TimeWeightedMetric:
+    """
+    Time average of a piecewise constant value (e.g. queue length). Area under
+    the value is accumulated on every change, so the average is O(1) per change
+    and doesn't depend on how often the value is sampled.
+    """
+
+    def __init__(self, clock: Clock, value=0) -> None:
+        self._clock = clock
+        self._start = clock.current_millis()
+        self._last_change = self._start
+        self._end = None
+        self._value = value
+        self._area = 0.0
 
-    def __init__(self) -> None:
-        self._state_changes = []
-        self._stopwatch = Stopwatch()
-        print("SimulationStatistics: start state stopwatch")
-        self._current_state = IDLE
-
-    def record_idle(self):
-        if self._current_state is BUSY:
-            elapsed = self._stopwatch.elapsed()
-            self._state_changes.append((self._current_state, elapsed))
-            self._current_state = IDLE
-            self._stopwatch = Stopwatch()
-            print("SimulationStatistics: System is IDLE (BUSY for {} ms)".format(elapsed))
-
-    def record_busy(self):
-        if self._current_state is IDLE:
-            elapsed = self._stopwatch.elapsed()
-            self._state_changes.append((self._current_state, elapsed))
-            self._current_state = BUSY
-            self._stopwatch = Stopwatch()
-            print("SimulationStatistics: System is BUSY (IDLE for {} ms)".format(elapsed))
-
-    def stop_record(self):
-        elapsed = self._stopwatch.elapsed()
-        state = self._current_state
-        print("SimulationStatistics: Final state is {} for {}".format(state, elapsed))
-        self._state_changes.append((state, elapsed))
-        self._current_state = None
-        self._stopwatch = None
-
-    def idle_time(self):
-        idle_states = filter(lambda state_change: state_change[0] is IDLE, self._state_changes)
-        return sum(map(lambda x: x[1], idle_states))
-
-    def busy_time(self):
-        busy_states = filter(lambda state_change: state_change[0] is BUSY, self._state_changes)
-        return sum(map(lambda x: x[1], busy_states))
+    @property
+    def value(self):
+        return self._value
+
+    def set(self, value):
+        now = self._clock.current_millis()
+        self._area = self._area + self._value * (now - self._last_change)
+        self._last_change = now
+        self._value = value
+
+    def add(self, delta):
+        self.set(self._value + delta)
+
+    def stop(self):
+        """
+        Fixes end of the observation period
+        """
+        self.set(self._value)
+        self._end = self._last_change
+
+    def area(self, until: float = None) -> float:
+        """
+        Returns area under the value up to 'until' time (not earlier than the last change),
+        by default up to the end of the observation period
+        """
+        if until is None:
+            until = self._end if self._end is not None else self._clock.current_millis()
+        return self._area + self._value * (until - self._last_change)
+
+    def duration(self) -> float:
+        end = self._end if self._end is not None else self._clock.current_millis()
+        return end - self._start
+
+    def average(self) -> float:
+        duration = self.duration()
+        return self.area() / duration if duration > 0 else self._value
 
 
 class JobDropMetric:
     def __init__(self) -> None:
         self._total_jobs = 0
-        self._processed_jobs = 0
         self._dropped_jobs = 0
 
     def record_job_arrival(self):
         self._total_jobs = self._total_jobs + 1
 
-    def record_job_processed(self):
-        self._processed_jobs = self._processed_jobs + 1
-
     def record_job_drop(self):
         self._dropped_jobs = self._dropped_jobs + 1
 
-    def job_drop_chance(self):
-        return round(float(self._dropped_jobs) / float(self._total_jobs) * 100, 2)
+    @property
+    def total_jobs(self) -> int:
+        return self._total_jobs
+
+    @property
+    def dropped_jobs(self) -> int:
+        return self._dropped_jobs
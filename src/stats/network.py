@@ -0,0 +1,148 @@
+import bisect
+import logging
+from typing import List, Dict
+
+from tabulate import tabulate
+
+from src.stats.metrics import StreamingMetric, Histogram
+from src.stats.stats import SimulationStatistics
+from src.systemtime import Clock
+
+logger = logging.getLogger(__name__)
+
+STATION_METRICS = [
+    ("Servers utilization", "Utilization (%)"),
+    ("Average queue size", "Queue size"),
+    ("Average time in queue", "Time in queue (ms)"),
+    ("Average jobs number in the system", "Jobs in station"),
+    ("Chance of reject", "Reject (%)"),
+]
+
+
+class NetworkStatistics:
+    """
+    Metrics of a network of stations. Every station collects its own metrics
+    with SimulationStatistics (a visit is an arrival there), while jobs are
+    followed end to end here: time from entering the network to leaving it,
+    number of visits and jobs lost at any station (rejected, evicted from a
+    queue or preempted). Jobs entering during the warm-up are left out; with
+    'auto_warmup' it ends once every station has warmed up, so jobs are
+    recorded one by one and left out after the run.
+    """
+
+    def __init__(self, clock: Clock, stations: Dict[str, SimulationStatistics], warmup: float = 0,
+                 auto_warmup: bool = False) -> None:
+        self._clock = clock
+        self._stations = stations
+        self._origin = clock.current_millis()
+        self._start = self._origin + warmup
+        self._auto_warmup = auto_warmup
+        self._in_network = {}  # job id to [entry time, visits]
+        self._entered = 0
+        self._lost = 0
+        self._sojourn_metric = StreamingMetric()
+        self._sojourn_histogram = Histogram()
+        self._visits_metric = StreamingMetric()
+        self._entries = []  # entry times of all jobs, with auto warm-up only
+        self._departures = []  # entry time, time in the network and visits of every job left, with auto warm-up only
+        self._losses = []  # entry times of lost jobs, with auto warm-up only
+
+    def job_entered(self, job):
+        now = self._clock.current_millis()
+        if now >= self._start:
+            self._in_network[job.id] = [now, 0]
+            self._entered = self._entered + 1
+            if self._auto_warmup:
+                self._entries.append(now)
+
+    def job_visited(self, job):
+        state = self._in_network.get(job.id)
+        if state is not None:
+            state[1] = state[1] + 1
+
+    def job_left(self, job):
+        state = self._in_network.pop(job.id, None)
+        if state is not None:
+            elapsed = self._clock.current_millis() - state[0]
+            self._sojourn_metric.add(elapsed)
+            self._sojourn_histogram.add(elapsed)
+            self._visits_metric.add(state[1])
+            if self._auto_warmup:
+                self._departures.append((state[0], elapsed, state[1]))
+            logger.debug("NetworkStatistics: %s left the network after %s ms", job, elapsed)
+
+    def job_lost(self, job):
+        state = self._in_network.pop(job.id, None)
+        if state is not None:
+            self._lost = self._lost + 1
+            if self._auto_warmup:
+                self._losses.append(state[0])
+
+    def warmup(self) -> float:
+        """
+        Returns duration of the warm-up excluded from end-to-end stats (ms):
+        the longest one of the stations with auto warm-up
+        """
+        if self._auto_warmup:
+            return max(stats.warmup() for stats in self._stations.values())
+        return self._start - self._origin
+
+    def get_general_stats(self):
+        return tabulate(self.general_stats(), numalign="right")
+
+    def general_stats(self) -> List[list]:
+        """
+        Returns rows of end-to-end metric name, value and unit
+        """
+        entered, lost = self._entered, self._lost
+        sojourn_metric, sojourn_histogram, visits_metric = \
+            self._sojourn_metric, self._sojourn_histogram, self._visits_metric
+        if self._auto_warmup:
+            start = self._origin + self.warmup()
+            entered = len(self._entries) - bisect.bisect_left(self._entries, start)
+            lost = sum(1 for entry in self._losses if entry >= start)
+            sojourn_metric, sojourn_histogram, visits_metric = StreamingMetric(), Histogram(), StreamingMetric()
+            for entry, elapsed, visits in self._departures:
+                if entry >= start:
+                    sojourn_metric.add(elapsed)
+                    sojourn_histogram.add(elapsed)
+                    visits_metric.add(visits)
+
+        loss_probability = round(lost / entered * 100, 2) if entered else 0.0
+        return [
+            ["Jobs entered the network", entered, "jobs"],
+            ["Jobs left the network", sojourn_metric.count, "jobs"],
+            ["Chance of loss", loss_probability, "%"],
+            ["Average time in the network", sojourn_metric.mean, "ms"],
+            ["Time in the network p50", sojourn_histogram.percentile(50), "ms"],
+            ["Time in the network p95", sojourn_histogram.percentile(95), "ms"],
+            ["Time in the network p99", sojourn_histogram.percentile(99), "ms"],
+            ["Average visits per job", visits_metric.mean, "visits"],
+        ]
+
+    def station_stats(self) -> List[list]:
+        """
+        Returns rows of station name, number of visits and values of STATION_METRICS
+        """
+        rows = []
+        for name, stats in self._stations.items():
+            values = {metric: value for metric, value, _ in stats.general_stats()}
+            rows.append([name, stats.arrived_jobs] + [values[metric] for metric, _ in STATION_METRICS])
+        return rows
+
+    def get_station_stats(self, offered_loads: Dict[str, float] = None) -> str:
+        """
+        Returns table of station metrics, with offered load of every station when it is given
+        """
+        headers = ["Station", "Visits"] + [header for _, header in STATION_METRICS]
+        rows = self.station_stats()
+        if offered_loads is not None:
+            headers.append("Offered load (%)")
+            rows = [row + [offered_loads[row[0]] * 100] for row in rows]
+        return tabulate(rows, headers=headers, numalign="right")
+
+    def bottleneck(self) -> str:
+        """
+        Returns name of the station with the highest servers utilization
+        """
+        return max(self.station_stats(), key=lambda row: row[2])[0]
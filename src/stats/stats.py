@@ -1,162 +1,348 @@
-from typing import List
+import bisect
+import logging
+from array import array
+from typing import List, Dict
 
 from tabulate import tabulate
 
 from src.job.jobs import Job
-from src.job.queue import JobStorage
-from src.job.server import JobProcessingServer
+from src.stats.estimation import mean_confidence_interval
 from src.stats.eventbus import Listener
-from src.stats.metrics import QueueSizeMetric, LoadMetric, JobProcessTimeMetric, WaitTimeMetric, SystemBusynessMetric, \
-    JobDropMetric
-from src.systemtime import Stopwatch
+from src.stats.metrics import StreamingMetric, Histogram, JobDropMetric, TimeWeightedMetric
+from src.stats.steadystate import Snapshot, mser_truncation, batch_ranges
+from src.systemtime import Clock, get_clock
 
+logger = logging.getLogger(__name__)
 
-class SimulationStatistics(Listener):
 
-    def __init__(self, queue: JobStorage, servers: List[JobProcessingServer]) -> None:
-        self._job_processing_metrics = []
-        self._load_metric = LoadMetric()
-        self._queue_size_metric = QueueSizeMetric()
-        self._wait_time_metrics = []
-        self._busyness_metric = SystemBusynessMetric()
+class SimulationStatistics(Listener):
+    """
+    Collects metrics of the simulation. System state (queue size, busy servers)
+    is tracked from events only, so statistics stay correct when events are
+    dispatched asynchronously. Time is measured with the clock of the event bus.
+
+    Queue length, number of jobs in the system and servers busyness are
+    time-weighted: they are integrated over time on every state change.
+
+    Totals are snapshotted every 'observation_interval' ms, so metrics can be
+    computed over a part of the run: the first 'warmup' ms (or the warm-up
+    detected by MSER-5 rule with 'auto_warmup') are excluded from the stats, and
+    the rest of the run can be split into batches for batch means estimation.
+    MSER-5 observes time in system of every processed job rather than the
+    observation intervals, which are too few to tell the warm-up from noise.
+    """
+
+    def __init__(self, clock: Clock = None, servers_number: int = None, observation_interval: float = None,
+                 warmup: float = 0, auto_warmup: bool = False) -> None:
+        self._clock = clock if clock is not None else get_clock()
+        self._servers_number = servers_number
+        self._processing_metric = StreamingMetric()
+        self._wait_time_metric = StreamingMetric()
+        self._processing_histogram = Histogram()  # durations since the last snapshot
+        self._wait_time_histogram = Histogram()
         self._job_drop_metric = JobDropMetric()
 
-        self._queue = queue
-        self._servers = servers
-
-        self._processing_time_dict = {}  # id to stopwatch
-        self._queue_time_dict = {}  # id to stopwatch
+        self._queued_jobs = 0
+        self._busy_servers = 0
+        self._queue_length_metric = TimeWeightedMetric(self._clock)
+        self._jobs_in_system_metric = TimeWeightedMetric(self._clock)
+        self._idle_metric = TimeWeightedMetric(self._clock, 1)
+        self._server_busy_metrics = {}  # server id to time-weighted busyness (0 or 1)
+
+        start = self._clock.current_millis()
+        self._observation_interval = observation_interval
+        self._auto_warmup = auto_warmup
+        self._finish_times = array('d')  # of processed jobs in order, with auto warm-up only
+        self._system_times = array('d')
+        self._snapshots = [self._snapshot(start)]
+        self._observations = 0  # snapshots taken on the observation grid, the last one may be at the end of the run
+        if warmup > 0:
+            self._next_observation = start + warmup
+        elif observation_interval is not None:
+            self._next_observation = start + observation_interval
+        else:
+            self._next_observation = None
+        self._truncation = 1 if warmup > 0 else 0  # index of the snapshot the stats start from
+        self._finished = False
+        self._observation_callback = None
+
+    def on_observation(self, callback):
+        """
+        Registers callback which is called with the number of observation intervals after every snapshot
+        """
+        self._observation_callback = callback
+
+    @property
+    def arrived_jobs(self) -> int:
+        return self._job_drop_metric.total_jobs
+
+    @property
+    def observations(self) -> int:
+        return self._observations
+
+    def steady_state_observations(self) -> int:
+        """
+        Returns number of observation intervals after the warm-up
+        """
+        return self._observations - self._truncation_index()
 
     def job_arrived(self, job):
+        self._observe()
+        if self._auto_warmup:  # time in system is observed to detect the warm-up
+            job.arrival_time = self._clock.current_millis()
         self._job_drop_metric.record_job_arrival()
 
     def job_schedule(self, job: Job):
-        print("SimulationStatistics: {} scheduled".format(job))
-        self._record_queue_size()
-        self._record_load()
-
-        self._record_system_busy()
+        self._observe()
+        logger.debug("SimulationStatistics: %s scheduled", job)
+        self._idle_metric.set(0)
 
     def job_processing_aborted(self, job):
-        print("SimulationStatistics: {} processing aborted".format(job))
-        del self._processing_time_dict[job.id]
+        self._observe()
+        logger.debug("SimulationStatistics: %s processing aborted", job)
+        job.start_time = None
+        self._record_server_state(job, False)
         self._job_drop_metric.record_job_drop()
 
     def job_process_start(self, job):
-        self._processing_time_dict[job.id] = Stopwatch()
-        print("SimulationStatistics: {} processing started".format(job))
+        self._observe()
+        self._record_server_state(job, True)
+        job.start_time = self._clock.current_millis()
+        logger.debug("SimulationStatistics: %s processing started", job)
 
     def job_was_processed(self, job):
-        self._record_queue_size()
-        self._record_load()
-
+        self._observe()
         self._record_job_finish(job)
+        self._record_server_state(job, False)
         if self._is_system_idle():
-            self._record_system_idle()
+            self._idle_metric.set(1)
 
     def all_jobs_processed(self):
-        self._busyness_metric.stop_record()
+        self._observe()
+        self._queue_length_metric.stop()
+        self._jobs_in_system_metric.stop()
+        self._idle_metric.stop()
+        for metric in self._server_busy_metrics.values():
+            metric.stop()
+        end = self._clock.current_millis()
+        if end > self._snapshots[-1].time:
+            self._snapshots.append(self._snapshot(end))
+        self._finished = True
+
+        if self._auto_warmup:
+            self._truncation = self._detect_warmup()
+        warmup = self._snapshots[self._truncation].time - self._snapshots[0].time
+        if warmup > 0:
+            logger.info("SimulationStatistics: Warm-up of %d ms is excluded from the stats", warmup)
 
     def job_queued(self, job):
-        print("SimulationStatistics: {} queued".format(job))
-        self._queue_time_dict[job.id] = Stopwatch()
+        self._observe()
+        logger.debug("SimulationStatistics: %s queued", job)
+        self._record_queue_change(1)
+        job.queued_time = self._clock.current_millis()
 
     def job_pop_from_queue(self, job):
-        print("SimulationStatistics: {} left queue".format(job))
-        if job.id not in self._queue_time_dict:
-            raise Exception("{} should be inside queue time dict, but it is not".format(job))
-        stopwatch = self._queue_time_dict[job.id]
-        elapsed = stopwatch.elapsed()
-        self._wait_time_metrics.append(WaitTimeMetric(job, elapsed))
-        del self._queue_time_dict[job.id]
+        self._observe()
+        logger.debug("SimulationStatistics: %s left queue", job)
+        if job.queued_time is None:
+            raise Exception("{} should have queued time, but it has not".format(job))
+        elapsed = self._clock.current_millis() - job.queued_time
+        self._wait_time_metric.add(elapsed)
+        self._wait_time_histogram.add(elapsed)
+        self._record_queue_change(-1)
 
     def job_dropped_from_queue(self, job):
-        print("SimulationStatistics: {} dropped from queue".format(job))
-        del self._queue_time_dict[job.id]
+        self._observe()
+        logger.debug("SimulationStatistics: %s dropped from queue", job)
+        self._record_queue_change(-1)
+        self._job_drop_metric.record_job_drop()
+
+    def job_rejected(self, job):
+        self._observe()
+        logger.debug("SimulationStatistics: %s rejected", job)
         self._job_drop_metric.record_job_drop()
 
     def get_general_stats(self):
-        _, avg_process_time, _ = self._process_time()
-        _, avg_queue_time, _ = self._queue_time()
-        avg_queue_size = self._queue_size()
-        avg_load = self._load_stat()
-        idle_probability = self._idle_probability()
-        reject_probability = self._reject_probability()
+        return tabulate(self.general_stats(), numalign="right")
+
+    def general_stats(self) -> List[list]:
+        """
+        Returns rows of metric name, value and unit over the run after the warm-up
+        """
+        snapshots = self._series()
+        return self._window_stats(snapshots, self._truncation_index(), len(snapshots) - 1)
+
+    def batch_means_stats(self, batches: int, confidence_level: float = 0.95) -> List[list]:
+        """
+        Splits the run after the warm-up into 'batches' batches of equal duration
+        and returns rows of metric name, mean of batch values, confidence interval
+        half-width and unit
+        """
+        snapshots = self._series()
+        batch_stats = [self._window_stats(snapshots, first, last)
+                       for first, last in batch_ranges(self._truncation_index(), self._observations, batches)]
+        rows = []
+        for i, (name, _, unit) in enumerate(batch_stats[0]):
+            mean, half_width = mean_confidence_interval([stats[i][1] for stats in batch_stats], confidence_level)
+            rows.append([name, mean, half_width, unit])
+        return rows
+
+    def warmup(self) -> float:
+        """
+        Returns duration of the warm-up excluded from the stats (ms)
+        """
+        return self._snapshots[self._truncation_index()].time - self._snapshots[0].time
+
+    def observed_duration(self) -> float:
+        """
+        Returns duration of the run the stats are collected over (ms), including the warm-up
+        """
+        snapshots = self._series()
+        return snapshots[-1].time - snapshots[0].time
+
+    def server_utilization(self) -> Dict[object, float]:
+        """
+        Returns percentage of time each server was busy after the warm-up, keyed by server id
+        """
+        snapshots = self._series()
+        return SimulationStatistics._server_utilization(snapshots[self._truncation_index()], snapshots[-1])
+
+    def _window_stats(self, snapshots: List[Snapshot], first: int, last: int) -> List[list]:
+        start = snapshots[first]
+        end = snapshots[last]
+        duration = end.time - start.time
+        processing_histogram = Histogram()
+        wait_time_histogram = Histogram()
+        for snapshot in snapshots[first + 1:last + 1]:
+            processing_histogram.merge(snapshot.processing_histogram)
+            wait_time_histogram.merge(snapshot.wait_histogram)
+
+        processed = end.processed - start.processed
+        waited = end.waited - start.waited
+        arrivals = end.arrivals - start.arrivals
+        avg_process_time = (end.processing_total - start.processing_total) / processed if processed else 0.0
+        avg_queue_time = (end.wait_total - start.wait_total) / waited if waited else 0.0
+        avg_queue_size = (end.queue_area - start.queue_area) / duration if duration > 0 else 0.0
+        avg_load = (end.system_area - start.system_area) / duration if duration > 0 else 0.0
+        idle_probability = round((end.idle_area - start.idle_area) / duration * 100, 2) if duration > 0 else 0.0
+        reject_probability = round((end.drops - start.drops) / arrivals * 100, 2) if arrivals else 0.0
         table = [
             ["Average job processing time", avg_process_time, "ms"],
+            ["Job processing time p50", processing_histogram.percentile(50), "ms"],
+            ["Job processing time p95", processing_histogram.percentile(95), "ms"],
+            ["Job processing time p99", processing_histogram.percentile(99), "ms"],
             ["Average time in queue", avg_queue_time, "ms"],
+            ["Time in queue p50", wait_time_histogram.percentile(50), "ms"],
+            ["Time in queue p95", wait_time_histogram.percentile(95), "ms"],
+            ["Time in queue p99", wait_time_histogram.percentile(99), "ms"],
             ["Average queue size", avg_queue_size, "jobs in queue"],
             ["Average jobs number in the system", avg_load, "jobs"],
+            ["Servers utilization", self._utilization(start, end), "%"],
             ["Chance of system being idle", idle_probability, "%"],
             ["Chance of reject", reject_probability, "%"]
         ]
-        return tabulate(table, numalign="right")
+        return table
 
     def _record_job_finish(self, job):
-        stopwatch = self._processing_time_dict[job.id]
-        elapsed = stopwatch.elapsed()
-        self._job_processing_metrics.append(JobProcessTimeMetric(job, elapsed))
-        print("SimulationStatistics: {} processed for {}".format(job, elapsed))
-        del self._processing_time_dict[job.id]
-        self._job_drop_metric.record_job_processed()
-
-    def _record_load(self):
-        jobs_number = 0
-        for server in self._servers:
-            if server.job is not None:
-                jobs_number = jobs_number + 1
-        queue_size = self._queue.size()
-        jobs_number = jobs_number + queue_size
-        self._load_metric.add(jobs_number)
-
-    def _record_queue_size(self):
-        queue_size = self._queue.size()
-        self._queue_size_metric.add(queue_size)
-
-    def _process_time(self):
-        stats = self._job_processing_metrics
-        time_per_job = [stat.process_time for stat in stats]
-        total_time = sum(time_per_job)
-        job_number = len(time_per_job)
-        avg_time = total_time / job_number
-        return total_time, avg_time, job_number
-
-    def _queue_time(self):
-        stats = self._wait_time_metrics
-        time_per_job = [stat.wait_time for stat in stats]
-        total_time = sum(time_per_job)
-        queued_jobs_number = len(time_per_job)
-        avg_time = total_time / queued_jobs_number if queued_jobs_number is not 0 else 0
-        return total_time, avg_time, queued_jobs_number
-
-    def _queue_size(self):
-        return self._queue_size_metric.average_queue_size()
-
-    def _load_stat(self):
-        return self._load_metric.average_load()
-
-    def _idle_probability(self) -> float:
-        busy_time = self._busyness_metric.busy_time()
-        idle_time = self._busyness_metric.idle_time()
-
-        total_time = busy_time + idle_time
-        print("SimulationStatistics: {} total time".format(total_time))
-
-        return round((idle_time / total_time) * 100, 2)
+        finish_time = self._clock.current_millis()
+        elapsed = finish_time - job.start_time
+        self._processing_metric.add(elapsed)
+        self._processing_histogram.add(elapsed)
+        if self._auto_warmup:
+            self._finish_times.append(finish_time)
+            self._system_times.append(finish_time - job.arrival_time)
+        logger.debug("SimulationStatistics: %s processed for %s", job, elapsed)
+
+    @staticmethod
+    def _server_utilization(start: Snapshot, end: Snapshot) -> Dict[object, float]:
+        duration = end.time - start.time
+        if duration <= 0:
+            return {server_id: 0.0 for server_id in end.busy_areas}
+        return {server_id: (area - start.busy_areas.get(server_id, 0.0)) / duration * 100
+                for server_id, area in end.busy_areas.items()}
+
+    def _utilization(self, start: Snapshot, end: Snapshot) -> float:
+        servers_number = self._servers_number if self._servers_number else len(end.busy_areas)
+        if servers_number == 0:
+            return 0.0
+        return sum(SimulationStatistics._server_utilization(start, end).values()) / servers_number
+
+    def _observe(self):
+        """
+        Takes snapshots at every observation time passed since the previous event
+        """
+        if self._next_observation is None:
+            return
+        now = self._clock.current_millis()
+        while now >= self._next_observation:
+            self._snapshots.append(self._snapshot(self._next_observation))
+            self._observations = len(self._snapshots) - 1
+            if self._observation_interval is None:
+                self._next_observation = None
+            else:
+                self._next_observation = self._next_observation + self._observation_interval
+            if self._observation_callback is not None:
+                self._observation_callback(self._observations)
+            if self._next_observation is None:
+                return
+
+    def _snapshot(self, time: float) -> Snapshot:
+        snapshot = Snapshot(time,
+                            self._queue_length_metric.area(time),
+                            self._jobs_in_system_metric.area(time),
+                            self._idle_metric.area(time),
+                            {server_id: metric.area(time) for server_id, metric in self._server_busy_metrics.items()},
+                            self._processing_metric.count, self._processing_metric.total,
+                            self._wait_time_metric.count, self._wait_time_metric.total,
+                            self._job_drop_metric.total_jobs, self._job_drop_metric.dropped_jobs,
+                            self._processing_histogram, self._wait_time_histogram)
+        self._processing_histogram = Histogram()
+        self._wait_time_histogram = Histogram()
+        return snapshot
+
+    def _series(self) -> List[Snapshot]:
+        """
+        Returns snapshots taken so far, followed by the current state while the run is not finished
+        """
+        if self._finished:
+            return self._snapshots
+        snapshots = list(self._snapshots)
+        snapshot = self._snapshot(self._clock.current_millis())
+        # histograms of the current interval are kept for the next snapshots
+        self._processing_histogram = snapshot.processing_histogram
+        self._wait_time_histogram = snapshot.wait_histogram
+        snapshots.append(snapshot)
+        return snapshots
+
+    def _truncation_index(self) -> int:
+        if self._auto_warmup and not self._finished:
+            return self._detect_warmup()  # warm-up so far, it is fixed once the run is finished
+        return self._truncation
+
+    def _detect_warmup(self) -> int:
+        """
+        Returns index of the snapshot the steady state starts from: the first
+        one after the last job cut by MSER-5 rule over times in system of processed jobs
+        """
+        truncated = mser_truncation(self._system_times)
+        if truncated == 0:
+            return 0
+        times = [snapshot.time for snapshot in self._snapshots[:self._observations + 1]]
+        return min(bisect.bisect_left(times, self._finish_times[truncated - 1]), self._observations)
+
+    def _record_queue_change(self, delta: int):
+        self._queued_jobs = self._queued_jobs + delta
+        self._queue_length_metric.set(self._queued_jobs)
+        self._jobs_in_system_metric.set(self._queued_jobs + self._busy_servers)
+
+    def _record_server_state(self, job: Job, busy: bool):
+        self._busy_servers = self._busy_servers + (1 if busy else -1)
+        self._jobs_in_system_metric.set(self._queued_jobs + self._busy_servers)
+        metric = self._server_busy_metrics.get(job.server_id)
+        if metric is None:
+            metric = TimeWeightedMetric(self._clock)
+            self._server_busy_metrics[job.server_id] = metric
+        metric.set(1 if busy else 0)
 
     def _is_system_idle(self) -> bool:
-        all_servers_idle = True
-        for server in self._servers:
-            if not server.is_idle:
-                all_servers_idle = False
-                break
-        return self._queue.is_empty() and all_servers_idle
-
-    def _record_system_idle(self):
-        self._busyness_metric.record_idle()
-
-    def _record_system_busy(self):
-        self._busyness_metric.record_busy()
-
-    def _reject_probability(self):
-        return self._job_drop_metric.job_drop_chance()
+        return self._queued_jobs == 0 and self._busy_servers == 0
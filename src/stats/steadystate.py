@@ -0,0 +1,84 @@
+from typing import List, Tuple, Dict, Sequence
+
+import numpy
+from tabulate import tabulate
+
+from src.stats.metrics import Histogram
+
+OBSERVATIONS = 500  # number of observation intervals the run (after fixed warm-up) is split into
+MSER_BATCH_SIZE = 5  # observations (times in system of processed jobs) averaged into a single value by MSER-5 rule
+
+
+class Snapshot:
+    """
+    State of the statistics at the end of an observation interval: totals
+    accumulated since the start of the run and histograms of durations
+    recorded during the interval only. Metrics of any range of intervals are
+    differences of two snapshots.
+    """
+
+    def __init__(self, time: float, queue_area: float, system_area: float, idle_area: float,
+                 busy_areas: Dict[object, float], processed: int, processing_total: float,
+                 waited: int, wait_total: float, arrivals: int, drops: int,
+                 processing_histogram: Histogram, wait_histogram: Histogram) -> None:
+        self.time = time
+        self.queue_area = queue_area
+        self.system_area = system_area
+        self.idle_area = idle_area
+        self.busy_areas = busy_areas  # server id to area under its busyness
+        self.processed = processed
+        self.processing_total = processing_total
+        self.waited = waited
+        self.wait_total = wait_total
+        self.arrivals = arrivals
+        self.drops = drops
+        self.processing_histogram = processing_histogram
+        self.wait_histogram = wait_histogram
+
+
+def mser_truncation(values: Sequence[float], batch_size: int = MSER_BATCH_SIZE) -> int:
+    """
+    Returns number of leading values to discard as warm-up by MSER rule:
+    values are averaged in batches of 'batch_size' and the truncation point
+    minimizes the squared standard error of the remaining batch means. Only
+    the first half of the series is searched, so the estimate keeps enough data.
+    """
+    batches = len(values) // batch_size
+    if batches < 2:
+        return 0
+    means = numpy.asarray(values[:batches * batch_size], dtype=float).reshape(batches, batch_size).mean(axis=1)
+    means = means - means.mean()  # keeps the sums of squares below accurate
+
+    # sums of the remaining means and of their squares for every truncation point
+    totals = numpy.cumsum(means[::-1])[::-1]
+    squares = numpy.cumsum((means ** 2)[::-1])[::-1]
+    n = batches - numpy.arange(batches // 2 + 1)
+    errors = (squares[:len(n)] - totals[:len(n)] ** 2 / n) / n ** 2
+    return int(numpy.argmin(errors)) * batch_size
+
+
+def batch_ranges(first: int, last: int, batches: int) -> List[Tuple[int, int]]:
+    """
+    Splits intervals between 'first' and 'last' snapshots into 'batches' ranges
+    of equal number of intervals. Leftover intervals are taken from the start,
+    which is the closest to the warm-up.
+    """
+    intervals = last - first
+    if intervals < batches:
+        raise Exception("Can't split {} observation intervals into {} batches".format(intervals, batches))
+    size = intervals // batches
+    start = last - size * batches
+    return [(start + i * size, start + (i + 1) * size) for i in range(batches)]
+
+
+def get_batch_means_stats(rows: List[list], confidence_level: float, analytic: List[list] = None) -> str:
+    """
+    Returns table of batch means with their confidence intervals, followed by
+    closed-form values when they are given
+    """
+    headers = ["Metric", "Mean", "± ({:g}% CI)".format(confidence_level * 100)]
+    if analytic is None:
+        return tabulate(rows, headers=headers + ["Unit"], numalign="right")
+    analytic_values = {name: value for name, value, _ in analytic}
+    table = [[name, mean, half_width, analytic_values.get(name), unit] for name, mean, half_width, unit in rows]
+    return tabulate(table, headers=headers + ["Analytic", "Unit"], numalign="right")
@@ -0,0 +1,48 @@
+import logging
+from typing import Dict
+
+from src.stats.stats import SimulationStatistics
+
+logger = logging.getLogger(__name__)
+
+
+class PrecisionStoppingRule:
+    """
+    Sequential stopping rule: tells whether the confidence intervals of batch
+    means of the target metrics are narrower than required. Batch means are
+    recomputed at batch boundaries only (every 'batches' observation intervals),
+    so the check costs nothing between them.
+    """
+
+    def __init__(self, stats: SimulationStatistics, targets: Dict[str, float], batches: int,
+                 confidence_level: float = 0.95) -> None:
+        self._stats = stats
+        self._targets = targets  # metric name to the required half-width of its confidence interval
+        self._batches = batches
+        self._confidence_level = confidence_level
+        self._reached = False
+
+    @property
+    def reached(self) -> bool:
+        return self._reached
+
+    def observed(self, observations: int) -> bool:
+        """
+        Returns True once the target precision is reached, checks it when 'observations' is a batch boundary
+        """
+        if self._reached:
+            return True
+        if observations % self._batches != 0 or self._stats.steady_state_observations() < self._batches:
+            return False
+
+        half_widths = {name: half_width for name, _, half_width, _
+                       in self._stats.batch_means_stats(self._batches, self._confidence_level)}
+        for name, target in self._targets.items():
+            if name not in half_widths:
+                raise Exception("Unknown metric '{}'. Expected one of: {}".format(name, list(half_widths.keys())))
+            if half_widths[name] > target:
+                return False
+        self._reached = True
+        logger.info("PrecisionStoppingRule: Target precision is reached after %d observation intervals",
+                    observations)
+        return True
@@ -0,0 +1,150 @@
+import csv
+import json
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from typing import List, Dict, Tuple
+
+import numpy
+from tabulate import tabulate
+
+from src.analytic import analytic_stats
+from src.configuration import ConfigReader, SWEEP_OUTPUT_KEY, SWEEP_CACHE_KEY, ANALYTIC_OFF, ANALYTIC_ONLY
+from src.replication import run_replication, create_pool, ReplicationRunner
+
+logger = logging.getLogger(__name__)
+
+
+class ParameterSweep:
+    """
+    Runs the model for every combination of swept parameters across a process
+    pool. Finished points are appended to the cache file (when configured), so
+    an interrupted or extended sweep only runs points that are not there yet.
+
+    Depending on 'analytic' setting, closed-form results are added next to
+    simulated ones, or replace simulation of points where they exist.
+
+    With several 'replications' every point is run by ReplicationRunner (its
+    replications in parallel, points one after another) and gets the mean of
+    every metric followed by the half-width of its confidence interval.
+    """
+
+    def __init__(self, config: ConfigReader, cache_path: str = None, seed: int = None, workers: int = None) -> None:
+        self._config = config
+        self._cache_path = cache_path
+        self._seed = seed
+        self._workers = workers
+
+    def run(self) -> List[Tuple[Dict[str, object], List[list]]]:
+        """
+        Returns list of sweep points with general stats rows of each of them
+        """
+        points = self._config.sweep_points()
+        point_configs = [self._config.with_parameters(point) for point in points]
+        keys = [ParameterSweep._cache_key(config) for config in point_configs]
+        seed = numpy.random.SeedSequence(self._seed)  # common random numbers across points
+
+        analytic_mode = self._config.analytic
+        analytic = [analytic_stats(config) if analytic_mode != ANALYTIC_OFF else None for config in point_configs]
+        skip_simulation = [analytic_mode == ANALYTIC_ONLY and rows is not None for rows in analytic]
+
+        cached = self._read_cache()
+        results = {key: cached[key] for key in keys if key in cached}
+        pending = [i for i, key in enumerate(keys) if key not in results and not skip_simulation[i]]
+        logger.info("Sweep: %s points, %s cached, %s solved analytically, %s to run", len(points),
+                    len(results), sum(skip_simulation), len(pending))
+
+        if pending and self._config.replications > 1:
+            for i in pending:
+                runner = ReplicationRunner(point_configs[i], self._config.replications,
+                                           self._config.confidence_level, seed.entropy, self._workers,
+                                           self._config.antithetic)
+                rows = ParameterSweep._summary_rows(runner.summary(runner.run()), self._config.confidence_level)
+                self._finished(results, keys[i], points[i], rows)
+        elif pending:
+            with create_pool(self._workers) as executor:
+                futures = {executor.submit(run_replication, point_configs[i], seed): i for i in pending}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    self._finished(results, keys[i], points[i], future.result())
+
+        return [(point, ParameterSweep._point_rows(results.get(key), analytic_rows))
+                for point, key, analytic_rows in zip(points, keys, analytic)]
+
+    @staticmethod
+    def table(results: List[Tuple[Dict[str, object], List[list]]]) -> Tuple[List[str], List[list]]:
+        """
+        Returns headers and rows with parameter values followed by metric values for every point.
+        Metrics missing for a point (e.g. percentiles of analytically solved points) are None.
+        """
+        columns = OrderedDict()
+        for _, rows in results:
+            for name, _, unit in rows:
+                columns["{} ({})".format(name, unit)] = None
+        headers = list(results[0][0].keys()) + list(columns.keys())
+        table = []
+        for point, rows in results:
+            values = {"{} ({})".format(name, unit): value for name, value, unit in rows}
+            table.append(list(point.values()) + [values.get(column) for column in columns])
+        return headers, table
+
+    @staticmethod
+    def get_sweep_stats(results: List[Tuple[Dict[str, object], List[list]]]) -> str:
+        headers, table = ParameterSweep.table(results)
+        return tabulate(table, headers=headers, numalign="right")
+
+    @staticmethod
+    def write_csv(results: List[Tuple[Dict[str, object], List[list]]], path: str):
+        headers, table = ParameterSweep.table(results)
+        with open(path, 'w', newline='') as stream:
+            writer = csv.writer(stream)
+            writer.writerow(headers)
+            writer.writerows(table)
+
+    def _finished(self, results: Dict[str, List[list]], key: str, point: Dict[str, object], rows: List[list]):
+        results[key] = rows
+        self._write_cache(key, rows)
+        logger.info("Sweep: finished point %s", dict(point))
+
+    @staticmethod
+    def _summary_rows(summary: List[list], confidence_level: float) -> List[list]:
+        """
+        Returns replication summary as general stats rows: the mean of every metric followed by its half-width
+        """
+        rows = []
+        for name, mean, half_width, unit in summary:
+            rows.append([name, mean, unit])
+            rows.append(["{} ± ({:g}% CI)".format(name, confidence_level * 100), half_width, unit])
+        return rows
+
+    @staticmethod
+    def _point_rows(simulated: List[list], analytic: List[list]) -> List[list]:
+        if simulated is None:
+            return analytic
+        if analytic is None:
+            return simulated
+        return simulated + [["{} (analytic)".format(name), value, unit] for name, value, unit in analytic]
+
+    @staticmethod
+    def _cache_key(config: ConfigReader) -> str:
+        model = {key: value for key, value in config.as_dict().items()
+                 if key not in [SWEEP_OUTPUT_KEY, SWEEP_CACHE_KEY]}
+        return json.dumps(model, sort_keys=True)
+
+    def _read_cache(self) -> Dict[str, List[list]]:
+        cache = {}
+        if self._cache_path is None or not os.path.exists(self._cache_path):
+            return cache
+        with open(self._cache_path, 'r') as stream:
+            for line in stream:
+                if line.strip():
+                    entry = json.loads(line)
+                    cache[entry["key"]] = entry["stats"]
+        return cache
+
+    def _write_cache(self, key: str, rows: List[list]):
+        if self._cache_path is None:
+            return
+        with open(self._cache_path, 'a') as stream:
+            stream.write(json.dumps({"key": key, "stats": rows}) + "\n")
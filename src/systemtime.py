@@ -1,22 +1,69 @@
 import time
 
 
+class Clock:
+
+    def current_millis(self):
+        raise Exception("Method current_millis is not implemented for {} clock".format(self.__class__.__name__))
+
+
+class SystemClock(Clock):
+
+    def current_millis(self) -> int:
+        return int(round(time.time() * 1000))
+
+
+class VirtualClock(Clock):
+    """
+    Simulated time source. The time moves only when the simulation engine
+    advances it, so measured intervals don't depend on OS scheduling.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = float(start)
+
+    def current_millis(self) -> float:
+        return self._now
+
+    def advance_to(self, millis: float):
+        if millis < self._now:
+            raise Exception("Virtual time can't go backwards: {} -> {}".format(self._now, millis))
+        self._now = millis
+
+
+_clock = SystemClock()
+
+
+def use_clock(clock: Clock):
+    """
+    Replaces time source used by 'current_millis' and 'Stopwatch'.
+    Should be called before any stopwatch of the simulation is created.
+    """
+    global _clock
+    _clock = clock
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
 def sleep(millis: int):
     if not isinstance(millis, int):
         raise Exception("Int value expected as sleep argument. Actual: {} ({})".format(millis, type(millis)))
     time.sleep(millis / 1000)
 
 
-def current_millis() -> int:
-    return int(round(time.time() * 1000))
+def current_millis():
+    return _clock.current_millis()
 
 
 class Stopwatch:
-    def __init__(self) -> None:
-        self._start = current_millis()
+    def __init__(self, clock: Clock = None) -> None:
+        self._clock = clock if clock is not None else _clock
+        self._start = self._clock.current_millis()
 
-    def elapsed(self) -> int:
-        return current_millis() - self._start
+    def elapsed(self):
+        return self._clock.current_millis() - self._start
 
     def is_elapsed(self, duration) -> bool:
         elapsed = self.elapsed()
@@ -0,0 +1,94 @@
+import itertools
+import logging
+import math
+from typing import Iterator
+
+import numpy
+
+from src.job.jobs import Job
+
+logger = logging.getLogger(__name__)
+
+TRACE_CHUNK_SIZE = 65536  # records read from the trace file at once
+
+ARRIVAL_COLUMN = 0  # arrival timestamp (ms)
+SERVICE_COLUMN = 1  # processing time (ms)
+PRIORITY_COLUMN = 2  # optional priority
+
+
+def read_trace(path: str, chunk_size: int = TRACE_CHUNK_SIZE) -> Iterator[numpy.ndarray]:
+    """
+    Reads recorded jobs in chunks of 'chunk_size' rows: arrival timestamp,
+    processing time and optionally priority. The file is either a CSV with a
+    header line or a '.npy' array of shape (n, 2) or (n, 3), which is
+    memory-mapped. Neither is loaded whole.
+    """
+    if path.endswith(".npy"):
+        records = numpy.load(path, mmap_mode='r')
+        if records.ndim != 2 or records.shape[1] not in (2, 3):
+            raise Exception("Trace array should have 2 or 3 columns. Actual shape: {}".format(records.shape))
+        for start in range(0, len(records), chunk_size):
+            yield numpy.array(records[start:start + chunk_size], dtype=float)
+        return
+
+    with open(path, 'r') as stream:
+        stream.readline()  # header
+        while True:
+            lines = list(itertools.islice(stream, chunk_size))
+            lines = [line for line in lines if line.strip()]
+            if not lines:
+                return
+            yield numpy.loadtxt(lines, delimiter=",", ndmin=2)
+
+
+class TraceReplay:
+    """
+    Replays recorded jobs in place of generated ones. Serves as both the
+    interval generator and the job generator of a queuing system:
+    'next_random' moves to the next record and returns the time since the
+    previous arrival (infinite once the trace is over, so no more jobs arrive),
+    'next' returns the job of the current record with its recorded processing
+    time. Jobs without recorded priority get one from 'priority_func'.
+    """
+
+    def __init__(self, chunks: Iterator[numpy.ndarray], id_func, priority_func) -> None:
+        self._chunks = chunks
+        self._id_func = id_func
+        self._priority_func = priority_func
+        self._records = iter([])
+        self._record = None
+        self._previous_arrival = None
+        self._replayed = 0
+
+    def next_random(self) -> float:
+        record = next(self._records, None)
+        while record is None:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                if self._record is not None:
+                    logger.info("TraceReplay: All %s recorded jobs were replayed", self._replayed)
+                self._record = None
+                return math.inf
+            self._records = iter(chunk.tolist())
+            record = next(self._records, None)
+
+        arrival = record[ARRIVAL_COLUMN]
+        previous = self._previous_arrival if self._previous_arrival is not None else arrival
+        if arrival < previous:
+            raise Exception("Trace arrivals should not decrease. Actual: {} after {}".format(arrival, previous))
+        self._previous_arrival = arrival
+        self._record = record
+        self._replayed = self._replayed + 1
+        return arrival - previous
+
+    def next(self) -> Job:
+        if self._record is None:
+            raise Exception("No recorded job to replay")
+        record = self._record
+        if len(record) > PRIORITY_COLUMN:
+            priority = int(record[PRIORITY_COLUMN])
+        else:
+            priority = self._priority_func()
+        job = Job(self._id_func(), priority, record[SERVICE_COLUMN])
+        logger.debug("TraceReplay: Replayed job - %s", job)
+        return job
@@ -0,0 +1,27 @@
+import copy
+import os
+
+import yaml
+
+from src.configuration import ConfigReader, CONFIG_ROOT_KEY
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "conf.yaml")
+
+
+def load_config(**parameters) -> ConfigReader:
+    with open(CONF_PATH, 'r') as stream:
+        config = yaml.safe_load(stream)
+    config[CONFIG_ROOT_KEY].update(copy.deepcopy(parameters))
+    return ConfigReader(CONF_PATH, config)
+
+
+def test_distributions_without_scale_are_not_swept():
+    config = load_config(InputDistribution={"type": "uniform", "low": 50, "high": 150},
+                         ProcessTimeDistribution={"type": "empirical", "values": [100, 200, 300]})
+    assert not config.is_sweep()
+    assert config.input_distribution().mean == 100
+
+
+def test_list_of_values_is_swept():
+    config = load_config(InputDistribution={"type": "uniform", "low": 50, "high": 150}, serversNumber=[2, 3])
+    assert config.sweep_parameters() == {"serversNumber": [2, 3]}
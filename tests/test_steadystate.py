@@ -0,0 +1,25 @@
+import numpy
+
+from src.stats.steadystate import mser_truncation
+
+
+def test_stationary_series_is_not_truncated():
+    for seed in range(10):
+        values = numpy.random.default_rng(seed).exponential(100, 20000)
+        assert mser_truncation(values) <= 0.01 * len(values)
+
+
+def test_warmup_is_truncated():
+    rng = numpy.random.default_rng(1)
+    values = numpy.concatenate([numpy.zeros(1000), rng.exponential(100, 19000)])  # starts empty
+    truncated = mser_truncation(values)
+    assert 1000 <= truncated <= 1100
+
+
+def test_cut_is_at_most_half_of_series():
+    values = numpy.arange(1000, 0, -1, dtype=float)  # decreasing all the way, never settles
+    assert mser_truncation(values) <= len(values) // 2
+
+
+def test_short_series_is_not_truncated():
+    assert mser_truncation([5.0, 1.0, 1.0]) == 0
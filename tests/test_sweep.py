@@ -0,0 +1,25 @@
+from src import sweep
+from src.sweep import ParameterSweep
+from tests.test_configuration import load_config
+
+
+class RecordingRunner(sweep.ReplicationRunner):
+    """
+    Records seeds of the replications instead of running them
+    """
+
+    seeds = []
+
+    def run(self):
+        RecordingRunner.seeds.append([seed.generate_state(4).tolist() for seed in self._spawn_seeds()])
+        return [[["Servers utilization", 50.0, "%"]] for _ in range(self._replications)]
+
+
+def test_replications_share_seeds_across_points(monkeypatch):
+    monkeypatch.setattr(sweep, "ReplicationRunner", RecordingRunner)
+    config = load_config(serversNumber=[2, 3, 4], replications=3, seed=None, analytic="off")
+    results = ParameterSweep(config, seed=config.seed).run()
+
+    assert len(results) == 3
+    assert len(RecordingRunner.seeds) == 3
+    assert RecordingRunner.seeds[0] == RecordingRunner.seeds[1] == RecordingRunner.seeds[2]